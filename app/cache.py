@@ -0,0 +1,57 @@
+"""
+In-memory cache helpers for AirdropAgent
+"""
+import time
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    def __init__(self, max_entries, ttl_seconds=None):
+        """
+        Thread-safe least-recently-used cache
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory
+            ttl_seconds (float, optional): Entries older than this are treated as missing
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get a value and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            value, stored_at = entry
+            if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, stored_at=None):
+        """Store a value, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (value, stored_at if stored_at is not None else time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove a value"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry is not None else default
+
+    def clear(self):
+        """Remove all values"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
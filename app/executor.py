@@ -0,0 +1,55 @@
+"""
+Executor bridge for AirdropAgent
+Runs blocking calls (requests, whois, BeautifulSoup, SQLite) in named thread pools
+so the asyncio event loop keeps serving twikit calls, timers and other tweets
+"""
+import sys
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import EXECUTOR_POOL_SIZES
+
+DEFAULT_POOL_SIZE = 4
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+def get_executor(pool):
+    """Get (or lazily create) the thread pool with the given name"""
+    with _executors_lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=EXECUTOR_POOL_SIZES.get(pool, DEFAULT_POOL_SIZE),
+                thread_name_prefix=f"airdrop-{pool}"
+            )
+            _executors[pool] = executor
+        return executor
+
+async def run_blocking(pool, func, *args, **kwargs):
+    """
+    Run a blocking function in a named thread pool without blocking the event loop
+    
+    Args:
+        pool (str): Name of the thread pool (see EXECUTOR_POOL_SIZES)
+        func (callable): Blocking function to run
+        
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(pool), functools.partial(func, *args, **kwargs))
+
+def shutdown_executors(wait=True):
+    """Shut down all thread pools"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    
+    for executor in executors:
+        executor.shutdown(wait=wait)
@@ -3,25 +3,56 @@
 Uses OpenRouter API to access AI models with fallback to heuristic analysis
 """
 import requests
-import json
+from requests.adapters import HTTPAdapter
 import re
-import time
+import asyncio
 import sys
 import os
 import random
 
 # Add root directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from config import OPENROUTER_API_KEY, OPENROUTER_URL
+from config import OPENROUTER_URL, OPENROUTER_MAX_CONNECTIONS, OPENROUTER_TIMEOUT_SECONDS
+from app.executor import run_blocking
+from app.models.openrouter_client import (get_openrouter_client, close_openrouter_client, get_openrouter_headers,
+                                          OpenRouterTimeout)
+from app.models.llm_cache import llm_cache, make_cache_key
 
 # Global tracking of successful model - persist across function calls
 LAST_SUCCESSFUL_MODEL = None
 # Global set of rate-limited models - persist across function calls
 RATE_LIMITED_MODELS = set()
 
+# Shared session for requests sent without httpx, so they reuse keep-alive connections to OpenRouter
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=OPENROUTER_MAX_CONNECTIONS))
+
 def analyze_airdrop(tweet_text, project_name, website_data=None):
     """
     Analyze an airdrop tweet using AI via OpenRouter with fallback to heuristics
+    Blocking wrapper around analyze_airdrop_async for callers without an event loop
+    
+    Args:
+        tweet_text (str): The text of the tweet
+        project_name (str): The name of the project
+        website_data (dict, optional): Additional data from website scraping
+        
+    Returns:
+        dict: Analysis results including rating, explanation, and scam flag
+    """
+    async def run():
+        try:
+            return await analyze_airdrop_async(tweet_text, project_name, website_data)
+        finally:
+            # The client belongs to this call's event loop, which asyncio.run closes
+            await close_openrouter_client()
+    
+    return asyncio.run(run())
+
+async def analyze_airdrop_async(tweet_text, project_name, website_data=None):
+    """
+    Analyze an airdrop tweet without blocking the event loop
+    Uses the pooled async OpenRouter client with fallback to heuristics
     
     Args:
         tweet_text (str): The text of the tweet
@@ -31,10 +62,18 @@ def analyze_airdrop(tweet_text, project_name, website_data=None):
     Returns:
         dict: Analysis results including rating, explanation, and scam flag
     """
+    # Copies of the same airdrop text reuse the cached model response
+    cache_key = make_cache_key(tweet_text, website_data)
+    cached_result = await run_blocking('database', llm_cache.get, cache_key)
+    if cached_result:
+        print("Using cached AI analysis")
+        return cached_result
+    
     # Try to use OpenRouter API first
     try:
-        ai_result = analyze_with_openrouter(tweet_text, project_name, website_data)
+        ai_result = await analyze_with_openrouter_async(tweet_text, project_name, website_data)
         if ai_result and ai_result.get('rating') > 0:
+            await run_blocking('database', llm_cache.put, cache_key, ai_result)
             return ai_result
     except Exception as e:
         print(f"OpenRouter API error: {e}. Falling back to heuristic analysis.")
@@ -43,9 +82,9 @@ def analyze_airdrop(tweet_text, project_name, website_data=None):
     print("Using heuristic analysis as fallback")
     return analyze_with_heuristics(tweet_text, project_name, website_data)
 
-def analyze_with_openrouter(tweet_text, project_name, website_data=None):
+def build_openrouter_prompt(tweet_text, project_name, website_data=None):
     """
-    Analyze using OpenRouter API with multiple free model fallbacks
+    Build the analysis prompt sent to OpenRouter models
     
     Args:
         tweet_text (str): The text of the tweet
@@ -53,17 +92,8 @@ def analyze_with_openrouter(tweet_text, project_name, website_data=None):
         website_data (dict, optional): Additional data from website scraping
         
     Returns:
-        dict or None: Analysis results or None if all models fail
+        str: Prompt text
     """
-    global LAST_SUCCESSFUL_MODEL, RATE_LIMITED_MODELS
-    
-    # Proper headers according to OpenRouter docs
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "HTTP-Referer": "https://generalism.id",  # Your domain for rankings
-        "X-Title": "AirdropAgent"                # Your app name for rankings
-    }
-    
     # Check for Telegram links in the tweet or website
     has_telegram_link = any(x in tweet_text.lower() for x in ['t.me/', 'telegram.me/', 'telegram.org/'])
     website_has_telegram = False
@@ -138,6 +168,25 @@ def analyze_with_openrouter(tweet_text, project_name, website_data=None):
         Analysis: [detailed analysis]
         """
     
+    return prompt
+
+def build_openrouter_payload(model, prompt):
+    """Build the chat completion request body for a model"""
+    # Proper JSON structure as per OpenRouter docs
+    return {
+        "model": model,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,  # Add some variability but not too much
+        "max_tokens": 1024   # Reasonable limit for response
+    }
+
+def get_model_order():
+    """
+    Get the free models to try, in order of preference
+    The last successful model is tried first unless it is rate limited
+    """
     # List of free models to try (in order of preference)
     free_models = [
         "google/gemini-2.0-flash-exp:free",    # Faster Gemini 2.0 Flash (free experimental version)
@@ -157,8 +206,119 @@ def analyze_with_openrouter(tweet_text, project_name, website_data=None):
             free_models.insert(0, LAST_SUCCESSFUL_MODEL)
             print(f"Prioritizing previously successful model: {LAST_SUCCESSFUL_MODEL}")
     
+    return free_models
+
+def parse_openrouter_analysis(model, analysis):
+    """
+    Turn a model's text output into an analysis result
+    
+    Args:
+        model (str): The model that produced the output
+        analysis (str): The model's response text
+        
+    Returns:
+        dict: Analysis results including rating, explanation, and scam flag
+    """
+    global LAST_SUCCESSFUL_MODEL
+    
+    # Extract rating using multiple regex patterns to handle different AI output formats
+    # First, try to find a rating with "Rating:" format
+    rating_match = re.search(r'Rating:\s*(\d+(?:\.\d+)?)', analysis, re.IGNORECASE)
+    
+    # If not found, look for patterns like "**Rating:** 2/10"
+    if not rating_match:
+        rating_match = re.search(r'\*\*Rating:\*\*\s*(\d+(?:\.\d+)?)(?:/10)?', analysis, re.IGNORECASE)
+    
+    # If not found, look for any number followed by /10
+    if not rating_match:
+        rating_match = re.search(r'(\d+(?:\.\d+)?)\/10', analysis, re.IGNORECASE)
+    
+    # Extract the rating if found
+    if rating_match:
+        rating = float(rating_match.group(1))
+    else:
+        # Default to 5.0 if no rating can be found
+        print("No rating found in output, defaulting to 5.0")
+        rating = 5.0
+    
+    # Ensure rating is within bounds
+    rating = max(1.0, min(10.0, rating))
+    
+    # Determine if the airdrop is a scam based on content analysis, not just the rating
+    # Check for strong indicators in the analysis content
+    is_scam = False
+    
+    # Look for scam-related terms in the conclusion
+    if 'scam' in analysis.lower() or 'suspicious' in analysis.lower():
+        # Count how many times scam-related words appear
+        scam_indicators = ['scam', 'suspicious', 'fraud', 'fake', 'red flag', 'misleading', 
+                          'avoid', 'caution', 'warning']
+        scam_count = sum(analysis.lower().count(indicator) for indicator in scam_indicators)
+    
+        # If there are multiple scam indicators or the rating is low, mark as scam
+        if scam_count > 1 or rating < 4.0:
+            is_scam = True
+    else:
+        # If no explicit scam indicators but rating is very low, still mark as scam
+        is_scam = rating < 4.0
+    
+    # Determine legitimacy based on rating (>7.5 is legitimate)
+    is_legitimate = rating > 7.5
+    
+    print(f"Successfully used model: {model}")
+    print(f"Rating: {rating}, Is Scam: {is_scam}, Is Legitimate: {is_legitimate}")
+    
+    # Update our successful model for future calls
+    LAST_SUCCESSFUL_MODEL = model
+    
+    return {
+        'rating': rating,
+        'analysis': analysis,
+        'is_scam': is_scam,
+        'is_legitimate': is_legitimate
+    }
+
+def _post_chat_sync(payload):
+    """Send a chat completion request through the pooled requests session"""
+    try:
+        return _session.post(OPENROUTER_URL, headers=get_openrouter_headers(), json=payload,
+                             timeout=OPENROUTER_TIMEOUT_SECONDS)
+    except requests.exceptions.Timeout as e:
+        raise OpenRouterTimeout(str(e)) from e
+
+async def post_chat(payload):
+    """
+    Send a chat completion request without blocking the event loop
+    
+    Args:
+        payload (dict): Request body
+        
+    Returns:
+        httpx.Response or requests.Response: The raw response
+    """
+    client = get_openrouter_client()
+    if client is None:
+        # No async HTTP client installed - send it with requests in the LLM thread pool
+        return await run_blocking('llm', _post_chat_sync, payload)
+    return await client.post_chat(payload)
+
+async def analyze_with_openrouter_async(tweet_text, project_name, website_data=None):
+    """
+    Analyze using OpenRouter API with multiple free model fallbacks, without blocking the event loop
+    Requests go through the shared pooled async client; backoff delays use asyncio.sleep
+    
+    Args:
+        tweet_text (str): The text of the tweet
+        project_name (str): The name of the project
+        website_data (dict, optional): Additional data from website scraping
+        
+    Returns:
+        dict or None: Analysis results or None if all models fail
+    """
+    prompt = build_openrouter_prompt(tweet_text, project_name, website_data)
+    
     # Try each model until one succeeds
-    for model in free_models:
+    for model in get_model_order():
         # Skip models that are known to be rate limited
         if model in RATE_LIMITED_MODELS:
             print(f"Skipping rate-limited model: {model}")
@@ -169,131 +329,54 @@ def analyze_with_openrouter(tweet_text, project_name, website_data=None):
         base_delay = 2  # seconds
         
         for retry in range(max_retries):
-            try:
-                current_delay = base_delay * (2 ** retry)
-                
-                if retry > 0:
-                    print(f"Retry {retry}/{max_retries} for model {model} after {current_delay}s delay")
-                else:
-                    print(f"Trying model: {model}")
-                
-                # Proper JSON structure as per OpenRouter docs
-                payload = {
-                    "model": model,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,  # Add some variability but not too much
-                    "max_tokens": 1024   # Reasonable limit for response
-                }
-                
-                # Using json parameter instead of data with json.dumps()
-                response = requests.post(
-                    OPENROUTER_URL, 
-                    headers=headers, 
-                    json=payload, 
-                    timeout=30  # Extended timeout for larger models
-                )
-                
-                # Handle rate limiting specifically
-                if response.status_code == 429:
-                    error_data = response.json() if response.text else {"error": {"message": "Rate limited"}}
-                    print(f"Rate limit hit for model {model}: {error_data}")
-                    
-                    # Add to rate limited models to skip for this session
-                    RATE_LIMITED_MODELS.add(model)
-                    
-                    # No need to retry this model - move to next
-                    break
-                
-                # Check for successful response
-                if response.status_code == 200:
-                    result = response.json()
-                    
-                    if 'choices' in result and len(result['choices']) > 0:
-                        analysis = result['choices'][0]['message']['content']
-                        
-                        # Extract rating using multiple regex patterns to handle different AI output formats
-                        # First, try to find a rating with "Rating:" format
-                        rating_match = re.search(r'Rating:\s*(\d+(?:\.\d+)?)', analysis, re.IGNORECASE)
-                        
-                        # If not found, look for patterns like "**Rating:** 2/10"
-                        if not rating_match:
-                            rating_match = re.search(r'\*\*Rating:\*\*\s*(\d+(?:\.\d+)?)(?:/10)?', analysis, re.IGNORECASE)
-                        
-                        # If not found, look for any number followed by /10
-                        if not rating_match:
-                            rating_match = re.search(r'(\d+(?:\.\d+)?)\/10', analysis, re.IGNORECASE)
-                        
-                        # Extract the rating if found
-                        if rating_match:
-                            rating = float(rating_match.group(1))
-                        else:
-                            # Default to 5.0 if no rating can be found
-                            print(f"No rating found in output, defaulting to 5.0")
-                            rating = 5.0
-                        
-                        # Ensure rating is within bounds
-                        rating = max(1.0, min(10.0, rating))
-                        
-                        # Determine if the airdrop is a scam based on content analysis, not just the rating
-                        # Check for strong indicators in the analysis content
-                        is_scam = False
-                        
-                        # Look for scam-related terms in the conclusion
-                        if 'scam' in analysis.lower() or 'suspicious' in analysis.lower():
-                            # Count how many times scam-related words appear
-                            scam_indicators = ['scam', 'suspicious', 'fraud', 'fake', 'red flag', 'misleading', 
-                                              'avoid', 'caution', 'warning']
-                            scam_count = sum(analysis.lower().count(indicator) for indicator in scam_indicators)
-                            
-                            # If there are multiple scam indicators or the rating is low, mark as scam
-                            if scam_count > 1 or rating < 4.0:
-                                is_scam = True
-                        else:
-                            # If no explicit scam indicators but rating is very low, still mark as scam
-                            is_scam = rating < 4.0
-                        
-                        # Determine legitimacy based on rating (>7.5 is legitimate)
-                        is_legitimate = rating > 7.5
-                        
-                        print(f"Successfully used model: {model}")
-                        print(f"Rating: {rating}, Is Scam: {is_scam}, Is Legitimate: {is_legitimate}")
-                        
-                        # Update our successful model for future calls
-                        LAST_SUCCESSFUL_MODEL = model
-                        
-                        return {
-                            'rating': rating,
-                            'analysis': analysis,
-                            'is_scam': is_scam,
-                            'is_legitimate': is_legitimate
-                        }
-                    else:
-                        print(f"Model {model} returned malformed response: {result}")
-                else:
-                    print(f"Model {model} returned error status: {response.status_code}")
-                    print(f"Error details: {response.text}")
-                    
-                    # For server errors (5xx), retry with backoff
-                    if 500 <= response.status_code < 600:
-                        time.sleep(current_delay)
-                        continue
-                    else:
-                        # For other errors, just try the next model
-                        break
+            current_delay = base_delay * (2 ** retry)
             
-            except requests.exceptions.Timeout:
+            if retry > 0:
+                print(f"Retry {retry}/{max_retries} for model {model} after {current_delay}s delay")
+            else:
+                print(f"Trying model: {model}")
+            
+            try:
+                response = await post_chat(build_openrouter_payload(model, prompt))
+            except OpenRouterTimeout:
                 print(f"Timeout with model {model} on attempt {retry+1}/{max_retries}")
-                time.sleep(current_delay)
+                await asyncio.sleep(current_delay)
                 continue
-                
             except Exception as e:
                 print(f"Error with model {model}: {str(e)}")
                 break
             
+            # Handle rate limiting specifically
+            if response.status_code == 429:
+                print(f"Rate limit hit for model {model}: {response.text or 'Rate limited'}")
+                # Add to rate limited models to skip for this session
+                RATE_LIMITED_MODELS.add(model)
+                break
+            
+            if response.status_code == 200:
+                try:
+                    result = response.json()
+                except ValueError:
+                    result = {}
+                
+                if 'choices' in result and len(result['choices']) > 0:
+                    return parse_openrouter_analysis(model, result['choices'][0]['message']['content'])
+                print(f"Model {model} returned malformed response: {result}")
+                continue
+            
+            print(f"Model {model} returned error status: {response.status_code}")
+            print(f"Error details: {response.text}")
+            
+            # For server errors (5xx), retry with backoff
+            if 500 <= response.status_code < 600:
+                await asyncio.sleep(current_delay)
+                continue
+            
+            # For other errors, just try the next model
+            break
+        
         # Short delay before trying next model
-        time.sleep(1)
+        await asyncio.sleep(1)
     
     # If all models fail, return None to trigger fallback
     print("All models failed or were rate-limited. Using heuristic fallback.")
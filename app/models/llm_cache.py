@@ -0,0 +1,110 @@
+"""
+LLM response cache for AirdropAgent
+Copy-pasted airdrop spam is analyzed once: responses are stored by a hash of the
+normalized tweet text and website data, in SQLite with an in-memory LRU on top
+"""
+import sys
+import os
+import re
+import json
+import hashlib
+import unicodedata
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from config import LLM_CACHE_TTL_HOURS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MEMORY_ENTRIES
+from app.cache import LRUCache
+import database
+
+CACHE_NAME = 'llm'
+
+MENTION_PATTERN = re.compile(r'@\w+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+DAYS_OLD_PATTERN = re.compile(r'^\d+ days ')
+
+def normalize_text(text):
+    """
+    Normalize text so copies that only differ in handles, emojis,
+    case or spacing produce the same key
+    """
+    text = MENTION_PATTERN.sub('', text or '')
+    # Drop emojis and other symbol characters
+    text = ''.join(ch for ch in text if unicodedata.category(ch)[0] not in ('S', 'C') or ch.isspace())
+    return WHITESPACE_PATTERN.sub(' ', text).strip().lower()
+
+def make_cache_key(tweet_text, website_data=None):
+    """
+    Build the cache key for an analysis
+
+    Args:
+        tweet_text (str): The text of the tweet
+        website_data (dict, optional): Additional data from website scraping
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    website_part = {}
+    if website_data:
+        website_part = {
+            'about_text': normalize_text(website_data.get('about_text', '')),
+            'team_info': normalize_text(website_data.get('team_info', '')),
+            'tokenomics': normalize_text(website_data.get('tokenomics', '')),
+            # The day count changes daily, the creation date does not
+            'domain_age': DAYS_OLD_PATTERN.sub('', website_data.get('domain_age', '') or '')
+        }
+
+    key_source = normalize_text(tweet_text) + '\x1f' + json.dumps(website_part, sort_keys=True)
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    def __init__(self, ttl_hours=LLM_CACHE_TTL_HOURS, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 memory_entries=LLM_CACHE_MEMORY_ENTRIES):
+        """
+        Create the cache
+
+        Args:
+            ttl_hours (float): Cached analyses older than this are ignored
+            max_entries (int): Maximum analyses kept in the database
+            memory_entries (int): Maximum analyses kept in memory
+        """
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self._memory = LRUCache(memory_entries, ttl_seconds=self.ttl_seconds)
+
+    def get(self, cache_key):
+        """
+        Look up a cached analysis
+
+        Returns:
+            dict or None: A copy of the cached analysis result
+        """
+        result = self._memory.get(cache_key)
+
+        if result is None:
+            try:
+                row = database.get_llm_cache_entry(cache_key, self.ttl_seconds)
+            except Exception as e:
+                print(f"LLM cache read error: {e}")
+                row = None
+
+            if row:
+                result = json.loads(row[0])
+                self._memory.put(cache_key, result, stored_at=row[1])
+
+        try:
+            database.record_cache_lookup(CACHE_NAME, hit=result is not None)
+        except Exception as e:
+            print(f"LLM cache stats error: {e}")
+
+        return dict(result) if result is not None else None
+
+    def put(self, cache_key, result):
+        """Store an analysis result"""
+        self._memory.put(cache_key, dict(result))
+        try:
+            database.save_llm_cache_entry(cache_key, json.dumps(result), self.max_entries, self.ttl_seconds)
+        except Exception as e:
+            print(f"LLM cache write error: {e}")
+
+# Shared cache instance
+llm_cache = LLMCache()
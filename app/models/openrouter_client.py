@@ -0,0 +1,114 @@
+"""
+Async OpenRouter client for AirdropAgent
+Keeps a long-lived pooled HTTP client so analyses reuse keep-alive (and HTTP/2) connections
+"""
+import sys
+import os
+import asyncio
+
+try:
+    import httpx
+except ImportError:  # Async client is optional - callers fall back to the sync path
+    httpx = None
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from config import (OPENROUTER_API_KEY, OPENROUTER_URL, OPENROUTER_MAX_CONNECTIONS, OPENROUTER_MAX_KEEPALIVE,
+                    OPENROUTER_KEEPALIVE_SECONDS, OPENROUTER_HTTP2, OPENROUTER_TIMEOUT_SECONDS)
+
+def get_openrouter_headers():
+    """Get request headers for the OpenRouter API"""
+    # Proper headers according to OpenRouter docs
+    return {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "HTTP-Referer": "https://generalism.id",  # Your domain for rankings
+        "X-Title": "AirdropAgent"                # Your app name for rankings
+    }
+
+class OpenRouterTimeout(Exception):
+    """Raised when an OpenRouter request times out"""
+
+class OpenRouterClient:
+    def __init__(self, max_connections=OPENROUTER_MAX_CONNECTIONS, max_keepalive=OPENROUTER_MAX_KEEPALIVE,
+                 keepalive_seconds=OPENROUTER_KEEPALIVE_SECONDS, http2=OPENROUTER_HTTP2,
+                 timeout=OPENROUTER_TIMEOUT_SECONDS):
+        """
+        Create a pooled async client for the OpenRouter host
+        
+        Args:
+            max_connections (int): Maximum concurrent connections (and in-flight requests) to OpenRouter
+            max_keepalive (int): Idle connections kept open for reuse
+            keepalive_seconds (float): How long an idle connection stays open
+            http2 (bool): Use HTTP/2 multiplexing if the h2 package is installed
+            timeout (float): Read timeout in seconds for a single request
+        """
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client = httpx.AsyncClient(
+            headers=get_openrouter_headers(),
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_seconds
+            ),
+            timeout=httpx.Timeout(timeout, connect=10.0)
+        )
+        # With HTTP/2 many requests share one connection, so cap in-flight requests as well
+        self._semaphore = asyncio.Semaphore(max_connections)
+    
+    async def post_chat(self, payload):
+        """
+        Send a chat completion request
+        
+        Args:
+            payload (dict): Request body
+            
+        Returns:
+            httpx.Response: The raw response
+        """
+        async with self._semaphore:
+            try:
+                return await self._client.post(OPENROUTER_URL, json=payload)
+            except httpx.TimeoutException as e:
+                raise OpenRouterTimeout(str(e)) from e
+    
+    async def aclose(self):
+        """Close all pooled connections"""
+        await self._client.aclose()
+
+# One client per event loop - httpx connections cannot be shared across loops
+_client = None
+_client_loop = None
+
+def get_openrouter_client():
+    """
+    Get the shared client for the running event loop
+    
+    Returns:
+        OpenRouterClient or None: None if httpx is not installed
+    """
+    global _client, _client_loop
+    
+    if httpx is None:
+        return None
+    
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = OpenRouterClient()
+        _client_loop = loop
+    return _client
+
+async def close_openrouter_client():
+    """Close the shared client if it belongs to the running event loop"""
+    global _client, _client_loop
+    
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
@@ -0,0 +1,113 @@
+"""
+Concurrent processing pipeline for AirdropAgent
+Items flow through a chain of stages, each with its own queue and worker pool
+"""
+import asyncio
+import inspect
+
+
+class Stage:
+    def __init__(self, name, handler, workers=1):
+        """
+        Define a pipeline stage
+
+        Args:
+            name (str): Stage name used in logs and statistics
+            handler (callable): Sync or async function taking one item and returning
+                the item for the next stage, or None to drop it
+            workers (int): Number of concurrent workers for this stage
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    async def handle(self, item):
+        """Run the handler on a single item"""
+        result = self.handler(item)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def stats(self):
+        """Get counters for this stage"""
+        return {
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'errors': self.errors
+        }
+
+
+class Pipeline:
+    def __init__(self, stages, queue_size=0):
+        """
+        Create a pipeline from an ordered list of stages
+
+        Args:
+            stages (list): Stage objects in processing order
+            queue_size (int): Maximum items waiting in front of each stage (0 = unbounded)
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+
+    async def _worker(self, stage, in_queue, out_queue, results):
+        """Take items from the stage queue until cancelled"""
+        while True:
+            item = await in_queue.get()
+            try:
+                result = await stage.handle(item)
+                if result is None:
+                    stage.dropped += 1
+                else:
+                    stage.processed += 1
+                    if out_queue is not None:
+                        await out_queue.put(result)
+                    else:
+                        results.append(result)
+            except Exception as e:
+                stage.errors += 1
+                print(f"Error in {stage.name} stage: {e}")
+            finally:
+                in_queue.task_done()
+
+    async def run(self, items):
+        """
+        Feed items through every stage
+
+        Args:
+            items (iterable): Items for the first stage
+
+        Returns:
+            list: Items that came out of the last stage
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = []
+        workers = []
+
+        for index, stage in enumerate(self.stages):
+            out_queue = queues[index + 1] if index + 1 < len(queues) else None
+            for _ in range(stage.workers):
+                workers.append(asyncio.create_task(
+                    self._worker(stage, queues[index], out_queue, results)
+                ))
+
+        try:
+            for item in items:
+                await queues[0].put(item)
+
+            # A stage is finished once its queue is drained, at which point
+            # everything it produced is already waiting in the next queue
+            for queue in queues:
+                await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return results
+
+    def stats(self):
+        """Get counters for every stage"""
+        return {stage.name: stage.stats() for stage in self.stages}
@@ -0,0 +1,186 @@
+"""
+Headless browser pool for AirdropAgent
+Keeps a few Chrome instances warm for the Selenium scraping fallback, leases them
+to concurrent scrapes and recycles them after too many pages or too much memory
+"""
+import sys
+import os
+import time
+import threading
+from urllib.parse import urlsplit
+from contextlib import contextmanager
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+try:
+    import psutil
+except ImportError:  # Memory-based recycling is skipped without psutil
+    psutil = None
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from config import (BROWSER_POOL_SIZE, BROWSER_MAX_PAGES, BROWSER_MAX_RSS_MB, BROWSER_LEASE_TIMEOUT_SECONDS,
+                    BROWSER_READY_TIMEOUT_SECONDS, BROWSER_NETWORK_IDLE_MS)
+
+class BrowserPoolTimeout(Exception):
+    """Raised when no browser becomes free in time"""
+
+class PooledBrowser:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+        self.origins = set()  # Origins whose storage must be cleared before the next lease
+    
+    def rss_mb(self):
+        """Memory used by the driver and its browser processes, or None if unknown"""
+        if psutil is None:
+            return None
+        try:
+            process = psutil.Process(self.driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return None
+    
+    def reset(self):
+        """
+        Drop the state left by earlier pages before the next lease
+        
+        Cookies are cleared for every domain; local storage, IndexedDB, cache storage and
+        service workers are cleared for each origin the browser ended up on.
+        """
+        url = urlsplit(self.driver.current_url)
+        if url.scheme in ('http', 'https'):
+            self.origins.add(f"{url.scheme}://{url.netloc}")
+        
+        # Stop the page's scripts first so it cannot write anything back
+        self.driver.get("about:blank")
+        self.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        for origin in self.origins:
+            self.driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        self.origins.clear()
+    
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"Error closing browser: {e}")
+
+class BrowserPool:
+    def __init__(self, driver_factory, size=BROWSER_POOL_SIZE, max_pages=BROWSER_MAX_PAGES,
+                 max_rss_mb=BROWSER_MAX_RSS_MB, lease_timeout=BROWSER_LEASE_TIMEOUT_SECONDS):
+        """
+        Create the pool (browsers are started on first use)
+        
+        Args:
+            driver_factory (callable): Returns a new WebDriver
+            size (int): Maximum browsers running at once
+            max_pages (int): Restart a browser after this many pages
+            max_rss_mb (float): Restart a browser above this memory use
+            lease_timeout (float): Seconds to wait for a free browser
+        """
+        self.driver_factory = driver_factory
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.lease_timeout = lease_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+        
+        if psutil is None:
+            print(f"WARNING: psutil is not installed - browsers are recycled only after {max_pages} pages, "
+                  f"not when they exceed {max_rss_mb} MB of memory (pip install psutil)")
+    
+    def _needs_recycle(self, browser):
+        """Check whether a browser should be replaced instead of reused"""
+        if browser.pages >= self.max_pages:
+            return True
+        rss = browser.rss_mb()
+        return rss is not None and rss > self.max_rss_mb
+    
+    @contextmanager
+    def lease(self):
+        """
+        Borrow a browser for one page
+        
+        Yields:
+            WebDriver: A ready browser, returned to the pool afterwards
+        """
+        if not self._slots.acquire(timeout=self.lease_timeout):
+            raise BrowserPoolTimeout(f"No browser free after {self.lease_timeout}s")
+        
+        browser = None
+        healthy = False
+        try:
+            with self._lock:
+                browser = self._idle.pop() if self._idle else None
+            if browser is None:
+                browser = PooledBrowser(self.driver_factory())
+            
+            yield browser.driver
+            healthy = True
+        finally:
+            if browser is not None:
+                browser.pages += 1
+                self._release(browser, healthy)
+            self._slots.release()
+    
+    def _release(self, browser, healthy):
+        """Return a browser to the pool, or quit it if it is broken, worn out or the pool is closed"""
+        if healthy and not self._closed and not self._needs_recycle(browser):
+            try:
+                browser.reset()
+                with self._lock:
+                    self._idle.append(browser)
+                return
+            except Exception:
+                pass  # Browser is unusable or its state could not be cleared - replace it
+        
+        browser.quit()
+    
+    def close_all(self):
+        """Quit every idle browser; leased ones quit when returned"""
+        self._closed = True
+        with self._lock:
+            idle = self._idle
+            self._idle = []
+        for browser in idle:
+            browser.quit()
+
+def wait_until_ready(driver, timeout=BROWSER_READY_TIMEOUT_SECONDS):
+    """
+    Wait until the document has finished loading
+    Pages that never finish (long polling, hanging scripts) are used as rendered so far
+
+    Returns:
+        bool: True if the document finished loading within the timeout
+    """
+    try:
+        WebDriverWait(driver, timeout).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+        return True
+    except TimeoutException:
+        return False
+
+def wait_for_network_idle(driver, idle_ms=BROWSER_NETWORK_IDLE_MS, timeout=BROWSER_READY_TIMEOUT_SECONDS):
+    """
+    Wait until the page stops loading resources
+    The page counts as idle once no new resource entries appear for idle_ms
+    """
+    deadline = time.time() + timeout
+    last_count = -1
+    stable_since = time.time()
+    
+    while time.time() < deadline:
+        count = driver.execute_script("return performance.getEntriesByType('resource').length")
+        if count != last_count:
+            last_count = count
+            stable_since = time.time()
+        elif (time.time() - stable_since) * 1000 >= idle_ms:
+            return True
+        time.sleep(0.1)
+    
+    return False
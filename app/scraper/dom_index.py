@@ -0,0 +1,114 @@
+"""
+Single-pass DOM index for AirdropAgent's website extractors
+One walk over the parsed page records id/class tokens, headings, paragraphs and
+supply mentions, so the about/team/tokenomics extractors never re-scan the soup
+"""
+from bs4 import NavigableString, Tag
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4')
+TEXT_BLOCK_TAGS = ('p', 'div', 'span', 'li')
+
+class DomIndex:
+    def __init__(self, soup):
+        """
+        Index a parsed page
+
+        Args:
+            soup (BeautifulSoup): Parsed page
+        """
+        self.soup = soup
+        self.id_tags = []        # (lowercase id, tag) in document order
+        self.class_tags = []     # (lowercase space-joined classes, tag) in document order
+        self.headings = []       # h1-h4 tags in document order
+        self.paragraphs = []     # p tags in document order
+        self.text_blocks = []    # p/div/span/li tags in document order
+        self.meta_description = None
+        self._supply_strings = []
+        self._text_cache = {}
+        self._supply_blocks = None
+
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                self._index_tag(node)
+            elif isinstance(node, NavigableString) and 'supply' in node.lower():
+                self._supply_strings.append(node)
+
+    def _index_tag(self, tag):
+        """Record a tag in the lookup lists it belongs to"""
+        name = tag.name
+        attrs = tag.attrs
+
+        tag_id = attrs.get('id')
+        if tag_id:
+            self.id_tags.append((str(tag_id).lower(), tag))
+
+        classes = attrs.get('class')
+        if classes:
+            if not isinstance(classes, str):
+                classes = ' '.join(classes)
+            self.class_tags.append((classes.lower(), tag))
+
+        if name in HEADING_TAGS:
+            self.headings.append(tag)
+        if name in TEXT_BLOCK_TAGS:
+            self.text_blocks.append(tag)
+            if name == 'p':
+                self.paragraphs.append(tag)
+        elif name == 'meta' and self.meta_description is None and attrs.get('name') == 'description':
+            self.meta_description = tag
+
+    def text(self, tag):
+        """Get a tag's text, computing it at most once"""
+        key = id(tag)
+        text = self._text_cache.get(key)
+        if text is None:
+            text = self._text_cache[key] = tag.text
+        return text
+
+    def first_with_id(self, keyword):
+        """Get the first tag whose id contains the keyword (case-insensitive)"""
+        for tag_id, tag in self.id_tags:
+            if keyword in tag_id:
+                return tag
+        return None
+
+    def all_with_class(self, *keywords):
+        """Get all tags whose class contains any of the keywords (case-insensitive)"""
+        return [tag for classes, tag in self.class_tags if any(keyword in classes for keyword in keywords)]
+
+    def heading_sections(self, keywords):
+        """
+        Get the text following each heading that mentions one of the keywords
+
+        Returns:
+            list: Joined sibling text up to the next heading, one entry per matching heading
+        """
+        sections = []
+        for heading in self.headings:
+            heading_text = self.text(heading).lower()
+            if not any(keyword in heading_text for keyword in keywords):
+                continue
+
+            # Get the next siblings until the next heading
+            content = []
+            for sibling in heading.find_next_siblings():
+                if sibling.name in HEADING_TAGS:
+                    break
+                sibling_text = self.text(sibling).strip()
+                if sibling_text:
+                    content.append(sibling_text)
+            if content:
+                sections.append(' '.join(content))
+        return sections
+
+    def supply_blocks(self):
+        """Get the p/div/span/li tags whose text mentions supply, in document order"""
+        if self._supply_blocks is None:
+            # Only ancestors of a string containing "supply" can match the supply pattern
+            candidates = set()
+            for string in self._supply_strings:
+                for parent in string.parents:
+                    if parent.name in TEXT_BLOCK_TAGS:
+                        candidates.add(id(parent))
+            self._supply_blocks = [tag for tag in self.text_blocks if id(tag) in candidates]
+        return self._supply_blocks
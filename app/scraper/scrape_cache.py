@@ -0,0 +1,119 @@
+"""
+Website scrape cache for AirdropAgent
+Keeps the extracted about/team/tokenomics data per page, with the ETag,
+Last-Modified and content hash needed to revalidate stale entries cheaply
+"""
+import sys
+import os
+import json
+import time
+import hashlib
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from config import SCRAPE_CACHE_TTL_MINUTES, SCRAPE_CACHE_MAX_ENTRIES, SCRAPE_CACHE_MEMORY_ENTRIES
+from app.cache import LRUCache
+import database
+
+CACHE_NAME = 'scrape'
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = {'ref', 'fbclid', 'gclid'}
+
+def normalize_url(url):
+    """Cache key for a URL - tracking parameters and fragments are ignored, the rest of the query is sorted"""
+    parsed = urlparse(url)
+    path = parsed.path.rstrip('/') or '/'
+    params = sorted((name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+                    if name.lower() not in TRACKING_PARAMS and not name.lower().startswith('utm_'))
+    query = f"?{urlencode(params)}" if params else ''
+    return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}{path}{query}"
+
+def hash_content(content):
+    """Hash raw page content"""
+    if isinstance(content, str):
+        content = content.encode('utf-8', errors='replace')
+    return hashlib.sha256(content).hexdigest()
+
+class ScrapeCache:
+    def __init__(self, ttl_minutes=SCRAPE_CACHE_TTL_MINUTES, max_entries=SCRAPE_CACHE_MAX_ENTRIES,
+                 memory_entries=SCRAPE_CACHE_MEMORY_ENTRIES):
+        """
+        Create the cache
+
+        Args:
+            ttl_minutes (float): Entries younger than this are served without a request
+            max_entries (int): Maximum pages kept in the database
+            memory_entries (int): Maximum pages kept in memory
+        """
+        self.ttl_seconds = ttl_minutes * 60
+        self.max_entries = max_entries
+        # Stale entries are still useful for revalidation, so no TTL in memory
+        self._memory = LRUCache(memory_entries)
+
+    def lookup(self, url):
+        """
+        Get the cache entry for a URL, fresh or stale
+
+        Returns:
+            dict or None: Entry with result, etag, last_modified, content_hash and fetched_at
+        """
+        key = normalize_url(url)
+        entry = self._memory.get(key)
+        if entry is None:
+            try:
+                row = database.get_scrape_cache_entry(key)
+            except Exception as e:
+                print(f"Scrape cache read error: {e}")
+                row = None
+
+            if row:
+                entry = dict(row, result=json.loads(row['result']))
+                self._memory.put(key, entry)
+        return entry
+
+    def is_fresh(self, entry):
+        """Check whether an entry can be served without revalidation"""
+        return time.time() - entry['fetched_at'] < self.ttl_seconds
+
+    def store(self, url, result, etag=None, last_modified=None, content_hash=None):
+        """Store freshly extracted website data"""
+        key = normalize_url(url)
+        entry = {
+            'url': key,
+            'domain': urlparse(url).netloc.lower(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': content_hash,
+            'result': dict(result),
+            'fetched_at': time.time()
+        }
+        self._memory.put(key, entry)
+        try:
+            database.save_scrape_cache_entry(key, entry['domain'], etag, last_modified, content_hash,
+                                             json.dumps(entry['result']), self.max_entries)
+        except Exception as e:
+            print(f"Scrape cache write error: {e}")
+
+    def revalidated(self, entry, etag=None, last_modified=None):
+        """Mark a stale entry as confirmed unchanged by the server"""
+        entry = dict(entry,
+                     etag=etag or entry['etag'],
+                     last_modified=last_modified or entry['last_modified'],
+                     fetched_at=time.time())
+        self._memory.put(entry['url'], entry)
+        try:
+            database.touch_scrape_cache_entry(entry['url'], entry['etag'], entry['last_modified'])
+        except Exception as e:
+            print(f"Scrape cache write error: {e}")
+
+    def record(self, hit):
+        """Count a hit (served without extraction) or a miss"""
+        try:
+            database.record_cache_lookup(CACHE_NAME, hit)
+        except Exception as e:
+            print(f"Scrape cache stats error: {e}")
+
+# Shared cache instance
+scrape_cache = ScrapeCache()
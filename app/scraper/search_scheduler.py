@@ -0,0 +1,185 @@
+"""
+Adaptive search scheduler for AirdropAgent
+Each search query gets its own interval, sized from the rate at which it turns up
+new tweets and stretched when the Twitter search rate limit runs low
+"""
+import sys
+import os
+import time
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from config import (SEARCH_INTERVAL_MINUTES, SEARCH_MIN_INTERVAL_SECONDS, SEARCH_MAX_INTERVAL_SECONDS,
+                    SEARCH_TARGET_YIELD, SEARCH_YIELD_SMOOTHING, SEARCH_RATE_LIMIT_RESERVE)
+
+# Largest change of a query's interval after one search (factor up or down)
+MAX_STEP = 2.0
+
+class SearchScheduler:
+    def __init__(self, queries, initial_interval=SEARCH_INTERVAL_MINUTES * 60, min_interval=SEARCH_MIN_INTERVAL_SECONDS,
+                 max_interval=SEARCH_MAX_INTERVAL_SECONDS, target_yield=SEARCH_TARGET_YIELD,
+                 smoothing=SEARCH_YIELD_SMOOTHING, rate_limit_reserve=SEARCH_RATE_LIMIT_RESERVE):
+        """
+        Create a scheduler with every query due now
+
+        Args:
+            queries (list): Search queries
+            initial_interval (float): Interval of a query with no history, in seconds
+            min_interval (float): Shortest interval, in seconds
+            max_interval (float): Longest interval, in seconds
+            target_yield (float): New tweets one search should find - the interval is sized for it
+            smoothing (float): Weight of the latest search in the moving averages (0-1)
+            rate_limit_reserve (float): Share of the search rate limit left unused
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_yield = target_yield
+        self.smoothing = smoothing
+        self.rate_limit_reserve = rate_limit_reserve
+        self.rate_limit = None  # {remaining, limit, reset} from the last search response
+        self.queries = {query: {
+            'interval': min(max(initial_interval, min_interval), max_interval),
+            'next_run_at': 0,
+            'last_run_at': None,
+            'last_yield': None,
+            'yield_avg': None,   # New tweets per search
+            'rate_avg': None,    # New tweets per second
+            'pages_avg': 1.0,    # Result pages per search
+            'runs': 0
+        } for query in queries}
+
+    def restore(self, saved):
+        """
+        Resume the cadence stored by an earlier run
+
+        Args:
+            saved (dict): Query -> stored schedule row (see database.get_search_schedule)
+        """
+        for query, state in self.queries.items():
+            row = saved.get(query)
+            if not row:
+                continue
+            for key in ('last_run_at', 'last_yield', 'yield_avg', 'rate_avg', 'runs', 'next_run_at'):
+                state[key] = row[key]
+            state['interval'] = min(max(row['interval_seconds'], self.min_interval), self.max_interval)
+            state['pages_avg'] = row['pages_avg'] or 1.0
+
+    def _average(self, previous, value):
+        """Exponential moving average step"""
+        if previous is None:
+            return value
+        return self.smoothing * value + (1 - self.smoothing) * previous
+
+    def _budget_factor(self, now):
+        """How much every interval must stretch to stay within the remaining rate limit"""
+        if not self.rate_limit or self.rate_limit['reset'] <= now:
+            return 1.0
+        window = self.rate_limit['reset'] - now
+        usable = self.rate_limit['remaining'] - self.rate_limit['limit'] * self.rate_limit_reserve
+        demand = sum(state['pages_avg'] / state['interval'] for state in self.queries.values()) * window
+        if usable <= 0:
+            return float('inf')
+        return max(1.0, demand / usable)
+
+    def update_rate_limit(self, remaining, limit, reset):
+        """
+        Record the search rate limit reported by Twitter
+
+        Args:
+            remaining (int): Searches left in the current window
+            limit (int): Searches allowed per window
+            reset (float): Unix time at which the window resets
+        """
+        self.rate_limit = {'remaining': remaining, 'limit': limit, 'reset': reset}
+
+    def due(self, now=None):
+        """Get the queries whose next search is due"""
+        now = time.time() if now is None else now
+        return [query for query, state in self.queries.items() if state['next_run_at'] <= now]
+
+    def record(self, query, new_tweets, pages, backlog=False, now=None):
+        """
+        Adjust a query's interval after a search
+
+        Args:
+            query (str): Searched query
+            new_tweets (int): Tweets newer than the query's watermark
+            pages (int): Result pages fetched
+            backlog (bool): The page budget ran out before reaching known tweets
+            now (float, optional): Unix time of the search
+        """
+        now = time.time() if now is None else now
+        state = self.queries[query]
+        elapsed = now - state['last_run_at'] if state['last_run_at'] else state['interval']
+
+        state['last_yield'] = new_tweets
+        state['yield_avg'] = self._average(state['yield_avg'], new_tweets)
+        state['rate_avg'] = self._average(state['rate_avg'], new_tweets / max(elapsed, 1))
+        state['pages_avg'] = self._average(state['pages_avg'], pages)
+        state['last_run_at'] = now
+        state['runs'] += 1
+
+        # Interval at which one search would find about target_yield new tweets
+        if state['rate_avg'] > 0:
+            interval = self.target_yield / state['rate_avg']
+        else:
+            interval = self.max_interval
+        if backlog:
+            # More new tweets than one search can page through - catch up quickly
+            interval = min(interval, state['interval'] / MAX_STEP)
+        interval = min(max(interval, state['interval'] / MAX_STEP), state['interval'] * MAX_STEP)
+        state['interval'] = min(max(interval, self.min_interval), self.max_interval)
+
+        self._schedule(query, now)
+
+    def record_error(self, query, now=None):
+        """Keep a query's interval after a failed search and try again when it is next due"""
+        self._schedule(query, time.time() if now is None else now)
+
+    def defer(self, query, until):
+        """Keep a query's interval but search it no earlier than the given Unix time"""
+        now = time.time()
+        if until <= now:
+            self._schedule(query, now)
+            return
+        state = self.queries[query]
+        state['next_run_at'] = max(state['next_run_at'], until)
+
+    def _schedule(self, query, now):
+        """Set a query's next search time, stretched to fit the rate limit"""
+        state = self.queries[query]
+        factor = self._budget_factor(now)
+        if factor == float('inf'):
+            # Window used up - wait at least until it resets
+            state['next_run_at'] = max(now + state['interval'], self.rate_limit['reset'])
+        elif factor > 1:
+            # Spread the remaining searches over the window, but never wait past its reset
+            delay = min(state['interval'] * factor, max(self.rate_limit['reset'] - now, state['interval']))
+            state['next_run_at'] = now + delay
+        else:
+            state['next_run_at'] = now + state['interval']
+
+    def seconds_until_next(self, now=None):
+        """Get the wait until the next query is due (0 if one is due now)"""
+        now = time.time() if now is None else now
+        return max(0, min(state['next_run_at'] for state in self.queries.values()) - now)
+
+    def snapshot(self):
+        """
+        Get the current cadence and yield of every query
+
+        Returns:
+            list: Dicts with query, interval_seconds, next_run_at, last_run_at, last_yield,
+                yield_avg, rate_avg, pages_avg and runs
+        """
+        return [{
+            'query': query,
+            'interval_seconds': state['interval'],
+            'next_run_at': state['next_run_at'],
+            'last_run_at': state['last_run_at'],
+            'last_yield': state['last_yield'],
+            'yield_avg': state['yield_avg'],
+            'rate_avg': state['rate_avg'],
+            'pages_avg': state['pages_avg'],
+            'runs': state['runs']
+        } for query, state in self.queries.items()]
@@ -0,0 +1,62 @@
+"""
+Seen-tweet index for AirdropAgent
+Keeps the IDs of already analyzed tweets in memory so polling cycles can drop
+them before any scraping or LLM calls
+"""
+import sys
+import os
+import threading
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+import database
+
+class SeenTweetIndex:
+    def __init__(self):
+        """Create an empty index - call warm() to load stored tweet IDs"""
+        self._seen = set()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self.skipped_total = 0
+    
+    def warm(self):
+        """Load the IDs of every tweet already stored in the database"""
+        tweet_ids = database.get_seen_tweet_ids()
+        with self._lock:
+            self._seen.update(tweet_ids)
+        print(f"Seen-tweet index warmed with {len(tweet_ids)} tweet IDs")
+    
+    def __contains__(self, tweet_id):
+        return str(tweet_id) in self._seen
+    
+    def __len__(self):
+        return len(self._seen)
+    
+    def claim(self, tweet_id):
+        """
+        Claim a tweet for processing
+        
+        Returns:
+            bool: False if the tweet was already processed or is being processed
+        """
+        tweet_id = str(tweet_id)
+        with self._lock:
+            if tweet_id in self._seen or tweet_id in self._in_flight:
+                self.skipped_total += 1
+                return False
+            self._in_flight.add(tweet_id)
+            return True
+    
+    def mark_processed(self, tweet_id):
+        """Record a tweet as stored so it is skipped from now on"""
+        tweet_id = str(tweet_id)
+        with self._lock:
+            self._in_flight.discard(tweet_id)
+            self._seen.add(tweet_id)
+    
+    def release_in_flight(self):
+        """Release claimed tweets that never got stored so the next cycle retries them"""
+        with self._lock:
+            released = len(self._in_flight)
+            self._in_flight.clear()
+        return released
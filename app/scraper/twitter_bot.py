@@ -238,7 +238,8 @@ def process_airdrop_tweets(self):
                     website_url=tweet_data["website_url"],
                     rating=analysis['rating'],
                     analysis=analysis['analysis'],
-                    is_scam=analysis['is_scam']
+                    is_scam=analysis['is_scam'],
+                    is_legitimate=analysis.get('is_legitimate')
                 )
                 
                 # If we have website data, save it too
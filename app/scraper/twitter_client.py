@@ -7,15 +7,25 @@
 import datetime
 import re
 from urllib.parse import urlparse
-import json
 
 # Add root directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from twikit import Client
-from config import TWITTER_USERNAME, TWITTER_PASSWORD, TWITTER_EMAIL, SEARCH_INTERVAL_MINUTES, TWEETS_PER_SEARCH
-from app.models.ai_analyzer import analyze_airdrop, extract_website_from_tweet
-from app.scraper.website_scraper import scrape_website
+from config import (TWITTER_USERNAME, TWITTER_PASSWORD, TWITTER_EMAIL, TWEETS_PER_SEARCH,
+                    SEARCH_QUERIES, SEARCH_MAX_PAGES, SEARCH_CONCURRENCY,
+                    PIPELINE_SCRAPE_WORKERS, PIPELINE_ANALYZE_WORKERS,
+                    PIPELINE_PERSIST_WORKERS, PIPELINE_QUEUE_SIZE, JOB_CLAIM_BATCH, JOB_POLL_SECONDS,
+                    JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS)
+from app.models.ai_analyzer import analyze_airdrop_async, extract_website_from_tweet
+from app.models.openrouter_client import close_openrouter_client
+from app.scraper.website_scraper import scrape_website_async
+from app.scraper.seen_index import SeenTweetIndex
+from app.scraper.search_scheduler import SearchScheduler
+from app.scraper.twitter_governor import TwitterGovernor, classify_error, ERROR_AUTH, ERROR_RATE_LIMIT
+from app.pipeline import Pipeline, Stage
+from app.executor import run_blocking, shutdown_executors
+from app.writer import airdrop_writer
 import database
 
 class TwitterClient:
@@ -26,52 +36,195 @@ def __init__(self, language="en-US"):
         self.login_attempts = 0
         self.max_login_attempts = 3
         self.cookies_file = 'twitter_cookies.json'
+        self.seen_tweets = SeenTweetIndex()
+        self.seen_tweets_warmed = False
+        self.search_slots = asyncio.Semaphore(SEARCH_CONCURRENCY)
+        self.search_watermarks = {}   # Query -> newest tweet handled, persisted across restarts
+        self.pending_watermarks = {}  # Query -> newest tweet found this cycle, saved once it is handled
+        self.scheduler = SearchScheduler(SEARCH_QUERIES)
+        self.session_rejected = False  # Saved cookies stopped working - log in with credentials
+        self.governor = TwitterGovernor(on_rate_limit=self.on_rate_limit)
+        self.governor.attach(self.client.http)
+    
+    def on_rate_limit(self, kind, remaining, limit, reset):
+        """Pass the search rate limit reported by Twitter on to the scheduler"""
+        if kind == 'search':
+            self.scheduler.update_rate_limit(remaining, limit, reset)
+    
+    def handle_call_error(self, error):
+        """
+        React to a failed twikit call - only a rejected session leads to a new login
+        
+        Returns:
+            str: Error kind (see classify_error)
+        """
+        kind = classify_error(error)
+        if kind == ERROR_AUTH:
+            print(f"Twitter session rejected ({error}) - logging in again")
+            self.is_logged_in = False
+            self.session_rejected = True
+        return kind
     
     async def login(self):
-        """Login to Twitter with credentials"""
+        """Restore the saved session, or log in with credentials when there is none or it was rejected"""
         if self.is_logged_in:
             return True
-            
-        if self.login_attempts >= self.max_login_attempts:
-            print("Maximum login attempts reached. Please check credentials.")
+        
+        # A saved session needs no login request
+        if not self.session_rejected and os.path.exists(self.cookies_file):
+            try:
+                self.client.load_cookies(self.cookies_file)
+                print("Restored Twitter session from saved cookies")
+                self.is_logged_in = True
+                return True
+            except Exception as e:
+                print(f"Could not load saved cookies: {e}")
+        
+        wait = self.governor.seconds_until_allowed('login')
+        if wait > 0:
+            print(f"Next login attempt allowed in {wait / 60:.1f} minutes")
             return False
             
         self.login_attempts += 1
             
         try:
+            # No cookies_file here - twikit would just reload the rejected session
             await self.client.login(
                 auth_info_1=TWITTER_USERNAME,
                 auth_info_2=TWITTER_EMAIL,
-                password=TWITTER_PASSWORD,
-                cookies_file=self.cookies_file
+                password=TWITTER_PASSWORD
             )
+            self.client.save_cookies(self.cookies_file)
             
             print("Successfully logged in to Twitter")
             self.is_logged_in = True
+            self.session_rejected = False
+            self.login_attempts = 0
             return True
             
         except Exception as e:
             print(f"Failed to login: {e}")
             self.is_logged_in = False
+            # Back off between failures, and pause for a long while after max_login_attempts in a row
+            if self.governor.login_failed(self.login_attempts, self.max_login_attempts):
+                self.login_attempts = 0
             return False
     
+    async def search_query(self, query):
+        """
+        Search one query for tweets newer than its watermark, following result cursors
+        until a page crosses the watermark, reaches already seen tweets, or the page
+        budget runs out
+        
+        Returns:
+            list: New tweets from every fetched page, newest first
+        """
+        watermark = self.search_watermarks.get(query)
+        since_id = watermark['tweet_id'] if watermark else None
+        search = f"{query} since_id:{since_id}" if since_id else query
+        
+        async with self.search_slots:
+            page = await self.governor.call('search', self.client.search_tweet, search, 'Latest',
+                                            count=TWEETS_PER_SEARCH)
+            tweets = []
+            pages = 1
+            while True:
+                newer = [tweet for tweet in page if since_id is None or int(tweet.id) > since_id]
+                tweets.extend(newer)
+                # Anything older than the watermark was already covered by an earlier cycle. Without
+                # one, a seen tweet marks that point - with one, page on to failed tweets held below it
+                if (len(newer) < len(page) or not len(page) or pages >= SEARCH_MAX_PAGES
+                        or (since_id is None and any(tweet.id in self.seen_tweets for tweet in page))):
+                    break
+                page = await self.governor.call('search', page.next)
+                pages += 1
+        
+        backlog = pages >= SEARCH_MAX_PAGES and len(newer) == len(page) and len(page) > 0
+        self.scheduler.record(query, len(tweets), pages, backlog)
+        
+        if since_id and backlog:
+            # Tweets between the last fetched page and the watermark were never fetched - keep the
+            # watermark so the next search (scheduled sooner for the backlog) pages down to them
+            print(f"Search '{query}': page budget ran out before the watermark - keeping it at {since_id}")
+        elif tweets:
+            newest = max(tweets, key=lambda tweet: int(tweet.id))
+            created_at = getattr(newest, 'created_at_datetime', None)
+            self.pending_watermarks[query] = {
+                'tweet_id': int(newest.id),
+                'tweet_at': created_at.isoformat() if created_at else None,
+                'tweet_ids': {int(tweet.id) for tweet in tweets}
+            }
+        
+        print(f"Search '{query}': {len(tweets)} new tweets in {pages} pages")
+        return tweets
+    
+    async def load_watermarks(self):
+        """Load the stored search watermarks"""
+        self.search_watermarks = await run_blocking('database', database.get_search_watermarks)
+        print(f"Loaded search watermarks for {len(self.search_watermarks)} queries")
+    
+    async def save_watermarks(self, held_ids=()):
+        """
+        Persist the watermarks of tweets handled this cycle
+        
+        Args:
+            held_ids (iterable, optional): IDs of tweets that failed and must be searched again -
+                a query's watermark stops just below the oldest of them
+        """
+        pending, self.pending_watermarks = self.pending_watermarks, {}
+        held_ids = {int(tweet_id) for tweet_id in held_ids}
+        for query, mark in list(pending.items()):
+            held = held_ids & mark.pop('tweet_ids')
+            if held:
+                # The next search's since_id returns the oldest failed tweet again
+                pending[query] = {'tweet_id': min(held) - 1, 'tweet_at': None}
+        if not pending:
+            return
+        await run_blocking('database', database.save_search_watermarks, pending)
+        for query, mark in pending.items():
+            current = self.search_watermarks.get(query)
+            if current is None or mark['tweet_id'] > current['tweet_id']:
+                self.search_watermarks[query] = mark
+    
     async def search_airdrops(self):
-        """Search for airdrop tweets"""
+        """Search for airdrop tweets with every query that is due, all at once"""
+        # Watermarks from a cycle that never finished must not be saved
+        self.pending_watermarks = {}
+        queries = self.scheduler.due()
+        if not queries:
+            return []
+        
         if not self.is_logged_in and not await self.login():
             print("Not logged in. Cannot search.")
             return []
-            
+        
+        results = await asyncio.gather(*(self.search_query(query) for query in queries), return_exceptions=True)
+        
+        # Merge the queries, keeping one copy of tweets several of them matched
+        merged = {}
+        for query, result in zip(queries, results):
+            if isinstance(result, Exception):
+                kind = self.handle_call_error(result)
+                print(f"Error searching for '{query}' ({kind}): {result}")
+                if kind == ERROR_RATE_LIMIT:
+                    # Same session, just later - right after the rate limit window resets
+                    self.scheduler.defer(query, self.governor.blocked_until.get('search', 0))
+                else:
+                    self.scheduler.record_error(query)
+                continue
+            for tweet in result:
+                merged.setdefault(tweet.id, tweet)
+        
+        # Keep the cadence visible to the dashboard and across restarts
         try:
-            # Search for #airdrop tweets
-            tweets = await self.client.search_tweet('#airdrop', 'Latest')
-            print(f"Found {len(tweets)} tweets")
-            
-            return tweets[:TWEETS_PER_SEARCH]  # Limit to configured number
-            
+            await run_blocking('database', database.save_search_schedule, self.scheduler.snapshot())
         except Exception as e:
-            print(f"Error searching for tweets: {e}")
-            self.is_logged_in = False  # Force re-login on next attempt
-            return []
+            print(f"Error saving search schedule: {e}")
+        
+        # Tweet IDs grow with time - newest first
+        tweets = sorted(merged.values(), key=lambda tweet: int(tweet.id), reverse=True)
+        print(f"Found {len(tweets)} unique tweets across {len(queries)} queries")
+        return tweets
     
     def extract_project_name(self, tweet_text, username):
         """Extract project name from tweet text"""
@@ -96,87 +249,239 @@ def extract_project_name(self, tweet_text, username):
         # Fallback to first part of username
         return username.split('@')[0] if '@' in username else username
     
+    def prepare_tweet(self, tweet):
+        """
+        Turn a raw tweet into a record for the pipeline
+        Returns None for tweets that should not be processed
+        """
+        # Extract basic tweet information
+        username = tweet.user.name
+        tweet_text = tweet.text
+        tweet_id = tweet.id
+        tweet_url = f"https://twitter.com/{tweet.user.screen_name}/status/{tweet_id}"
+        
+        # Skip if tweet text is too short
+        if len(tweet_text) < 30:
+            return None
+            
+        # Skip if not relevant to airdrops
+        if not any(keyword in tweet_text.lower() for keyword in 
+                   ['airdrop', 'token', 'claim', 'free', 'reward', 'crypto']):
+            return None
+        
+        # Extract project name from tweet text
+        project_name = self.extract_project_name(tweet_text, username)
+        
+        print(f"Processing tweet from {username} about {project_name}")
+        
+        return {
+            'tweet_id': tweet_id,
+            'username': username,
+            'tweet_text': tweet_text,
+            'tweet_url': tweet_url,
+            'project_name': project_name,
+            # Extract website URL from tweet
+            'website_url': extract_website_from_tweet(tweet_text),
+            'website_data': None,
+            'analysis': None
+        }
+    
+    async def scrape_tweet_website(self, record):
+        """Scrape stage: scrape project website if available"""
+        if record['website_url']:
+            record['website_data'] = await scrape_website_async(record['website_url'])
+        return record
+    
+    async def analyze_tweet(self, record):
+        """Analyze stage: get AI analysis"""
+        record['analysis'] = await analyze_airdrop_async(
+            record['tweet_text'],
+            record['project_name'],
+            record['website_data']
+        )
+        return record
+    
+    def persist_tweet(self, record):
+        """Persist stage: queue analysis and website data for the write-behind writer"""
+        analysis = record['analysis']
+        record['saved'] = airdrop_writer.submit({
+            'project_name': record['project_name'],
+            'username': record['username'],
+            'tweet_text': record['tweet_text'],
+            'tweet_url': record['tweet_url'],
+            'website_url': record['website_url'],
+            'rating': analysis['rating'],
+            'analysis': analysis['analysis'],
+            'is_scam': analysis['is_scam'],
+            'is_legitimate': analysis.get('is_legitimate'),
+            'timestamp': datetime.datetime.now(),
+            'tweet_id': str(record['tweet_id']),
+            'website_data': record['website_data']
+        })
+        return record
+    
+    async def wait_for_saves(self, records):
+        """
+        Wait until queued records are committed
+        
+        Returns:
+            list: Records that were saved (or had already been stored), with airdrop_id set
+        """
+        await run_blocking('database', airdrop_writer.flush)
+        
+        saved = []
+        for record in records:
+            try:
+                record['airdrop_id'] = await asyncio.wrap_future(record.pop('saved'))
+            except Exception as e:
+                print(f"Error saving tweet {record['tweet_id']}: {e}")
+                continue
+            
+            # Stored now (or already stored by someone else) - never analyze it again
+            self.seen_tweets.mark_processed(record['tweet_id'])
+            saved.append(record)
+        return saved
+    
+    def build_pipeline(self):
+        """Build the scrape -> analyze -> persist pipeline for prepared tweet records"""
+        return Pipeline([
+            Stage('scrape', self.scrape_tweet_website, PIPELINE_SCRAPE_WORKERS),
+            Stage('analyze', self.analyze_tweet, PIPELINE_ANALYZE_WORKERS),
+            Stage('persist', self.persist_tweet, PIPELINE_PERSIST_WORKERS)
+        ], queue_size=PIPELINE_QUEUE_SIZE)
+    
+    async def search_new_tweets(self):
+        """Search for airdrop tweets and claim the ones not analyzed yet"""
+        tweets = await self.search_airdrops()
+        if not tweets:
+            return []
+        
+        # Drop already analyzed tweets before any network I/O
+        new_tweets = [tweet for tweet in tweets if self.seen_tweets.claim(tweet.id)]
+        skipped = len(tweets) - len(new_tweets)
+        print(f"Skipped {skipped} already-seen tweets ({self.seen_tweets.skipped_total} total), "
+              f"{len(new_tweets)} new")
+        return new_tweets
+    
     async def process_airdrop_tweets(self):
         """
         Process airdrop tweets: search, extract data, analyze with AI, and save to database
+        Tweets run through a bounded-concurrency pipeline so slow websites or
+        models only hold up their own stage
         Returns the number of processed tweets
         """
-        tweets = await self.search_airdrops()
-        processed_count = 0
+        new_tweets = await self.search_new_tweets()
         
-        for tweet in tweets:
-            try:
-                # Extract basic tweet information
-                username = tweet.user.name
-                tweet_text = tweet.text
-                tweet_id = tweet.id
-                tweet_url = f"https://twitter.com/{tweet.user.screen_name}/status/{tweet_id}"
+        try:
+            records = [record for record in map(self.prepare_tweet, new_tweets) if record is not None]
+            pipeline = self.build_pipeline()
+            processed = await self.wait_for_saves(await pipeline.run(records))
+            print(f"Pipeline stats: {pipeline.stats()}")
+            
+            # Searches move past stored and filtered tweets, but stop below any that failed
+            # to scrape, analyze or save so the next search returns them again
+            stored = {str(record['tweet_id']) for record in processed}
+            failed = [record['tweet_id'] for record in records if str(record['tweet_id']) not in stored]
+            await self.save_watermarks(held_ids=failed)
+        finally:
+            # Failed tweets were never stored - free them for the search that returns them again
+            self.seen_tweets.release_in_flight()
+        
+        return len(processed)
+    
+    async def queue_airdrop_tweets(self):
+        """
+        Ingestion cycle: search and queue new tweets for the analysis workers
+        Returns the number of queued tweets
+        """
+        new_tweets = await self.search_new_tweets()
+        
+        try:
+            records = [record for record in map(self.prepare_tweet, new_tweets) if record is not None]
+            if records:
+                queued = await run_blocking('database', database.enqueue_analysis_jobs, records)
+                print(f"Queued {queued} tweets for analysis ({len(records) - queued} already queued)")
                 
-                # Skip if tweet text is too short
-                if len(tweet_text) < 30:
-                    continue
-                    
-                # Skip if not relevant to airdrops
-                if not any(keyword in tweet_text.lower() for keyword in 
-                           ['airdrop', 'token', 'claim', 'free', 'reward', 'crypto']):
+                # The job queue owns these tweets now - never queue them again
+                for record in records:
+                    self.seen_tweets.mark_processed(record['tweet_id'])
+            
+            # Queued tweets are safe and filtered ones never qualify - searches may move past both
+            await self.save_watermarks()
+        finally:
+            # Nothing stays claimed once the cycle ends
+            self.seen_tweets.release_in_flight()
+        
+        return len(records)
+    
+    async def process_analysis_jobs(self, worker, jobs):
+        """
+        Analysis cycle: run claimed jobs through the scrape -> analyze -> persist pipeline
+        Jobs whose tweet was stored are removed from the queue; the rest are retried
+        by any worker until they run out of attempts
+        Returns the number of stored tweets
+        """
+        records = []
+        for job in jobs:
+            record = job['record']
+            record['job_id'] = job['id']
+            records.append(record)
+        
+        pipeline = self.build_pipeline()
+        processed = await self.wait_for_saves(await pipeline.run(records))
+        print(f"[{worker}] Pipeline stats: {pipeline.stats()}")
+        
+        done = {record['job_id'] for record in processed}
+        await run_blocking('database', database.complete_analysis_jobs, list(done))
+        
+        for job in jobs:
+            if job['id'] in done:
+                continue
+            retried = await run_blocking('database', database.fail_analysis_job, job['id'],
+                                         'not stored - see worker log', JOB_MAX_ATTEMPTS)
+            if not retried:
+                print(f"[{worker}] Giving up on tweet {job['record']['tweet_id']} after {job['attempts']} attempts")
+        
+        return len(processed)
+    
+    async def run_analysis_loop(self, worker):
+        """Claim and analyze queued tweets until stopped"""
+        released = await run_blocking('database', database.release_analysis_jobs, worker)
+        if released:
+            print(f"[{worker}] Returned {released} unfinished jobs from the previous run to the queue")
+        
+        while True:
+            try:
+                jobs = await run_blocking('database', database.claim_analysis_jobs, worker,
+                                          JOB_CLAIM_BATCH, JOB_LEASE_SECONDS)
+                if not jobs:
+                    await asyncio.sleep(JOB_POLL_SECONDS)
                     continue
                 
-                # Extract project name from tweet text
-                project_name = self.extract_project_name(tweet_text, username)
-                
-                print(f"Processing tweet from {username} about {project_name}")
-                
-                # Extract website URL from tweet
-                website_url = extract_website_from_tweet(tweet_text)
-                
-                # Scrape project website if available
-                website_data = None
-                if website_url:
-                    website_data = scrape_website(website_url)
-                
-                # Get AI analysis
-                analysis = analyze_airdrop(
-                    tweet_text, 
-                    project_name,
-                    website_data
-                )
-                
-                # Save to database
-                airdrop_id = database.save_airdrop_analysis(
-                    project_name=project_name,
-                    username=username,
-                    tweet_text=tweet_text,
-                    tweet_url=tweet_url,
-                    website_url=website_url,
-                    rating=analysis['rating'],
-                    analysis=analysis['analysis'],
-                    is_scam=analysis['is_scam'],
-                    timestamp=datetime.datetime.now()
-                )
-                
-                # If we have website data, save it too
-                if website_data and airdrop_id:
-                    database.save_website_data(
-                        project_id=airdrop_id,
-                        about_text=website_data.get('about_text', ''),
-                        team_info=website_data.get('team_info', ''),
-                        tokenomics=website_data.get('tokenomics', ''),
-                        domain_age=website_data.get('domain_age', '')
-                    )
-                
-                processed_count += 1
-                
-                # Add some delay to avoid rate limiting
-                await asyncio.sleep(1)
+                stored = await self.process_analysis_jobs(worker, jobs)
+                print(f"[{worker}] Stored {stored} of {len(jobs)} claimed tweets")
                 
             except Exception as e:
-                print(f"Error processing tweet: {e}")
-                continue
-        
-        return processed_count
+                print(f"[{worker}] Error in analysis loop: {e}")
+                await asyncio.sleep(JOB_POLL_SECONDS)
     
-    async def run_monitoring_loop(self):
-        """Run the monitoring loop"""
+    async def run_monitoring_loop(self, process_cycle=None):
+        """
+        Run the monitoring loop
+        
+        Args:
+            process_cycle (coroutine function, optional): Work done after each search interval -
+                process_airdrop_tweets (default) or queue_airdrop_tweets
+        """
+        if process_cycle is None:
+            process_cycle = self.process_airdrop_tweets
+        
+        if not self.seen_tweets_warmed:
+            await run_blocking('database', self.seen_tweets.warm)
+            await self.load_watermarks()
+            self.scheduler.restore(await run_blocking('database', database.get_search_schedule))
+            self.seen_tweets_warmed = True
+        
         while True:
             try:
                 print(f"Starting airdrop search at {datetime.datetime.now()}")
@@ -185,19 +490,20 @@ async def run_monitoring_loop(self):
                     if not await self.login():
                         # If login fails, wait and try again
                         print("Login failed. Waiting before retry...")
-                        await asyncio.sleep(60)
+                        await asyncio.sleep(max(60, self.governor.seconds_until_allowed('login')))
                         continue
                 
-                processed_count = await self.process_airdrop_tweets()
+                processed_count = await process_cycle()
                 print(f"Processed {processed_count} airdrop tweets")
                 
-                # Wait for the configured interval
-                print(f"Waiting {SEARCH_INTERVAL_MINUTES} minutes before next search")
-                await asyncio.sleep(SEARCH_INTERVAL_MINUTES * 60)
+                # Sleep until the next query is due
+                wait = self.scheduler.seconds_until_next()
+                print(f"Next search in {wait / 60:.1f} minutes")
+                await asyncio.sleep(wait)
                 
             except Exception as e:
                 print(f"Error in monitoring loop: {e}")
-                self.is_logged_in = False  # Force re-login
+                self.handle_call_error(e)  # Re-login only if the session was rejected
                 await asyncio.sleep(60)  # Wait a minute before retrying
 
 
@@ -210,6 +516,40 @@ async def start_twitter_monitoring():
         print("Twitter monitoring stopped by user")
     except Exception as e:
         print(f"Error in Twitter monitoring: {e}")
+    finally:
+        # Commit analyses still waiting for a batch
+        airdrop_writer.close()
+        await close_openrouter_client()
+        shutdown_executors(wait=False)
+
+
+async def start_ingestion():
+    """Start the ingestion process: search Twitter and queue new tweets for analysis"""
+    client = TwitterClient()
+    try:
+        await client.run_monitoring_loop(client.queue_airdrop_tweets)
+    except KeyboardInterrupt:
+        print("Twitter ingestion stopped")
+    except Exception as e:
+        print(f"Error in Twitter ingestion: {e}")
+    finally:
+        shutdown_executors(wait=False)
+
+
+async def start_analysis_worker(worker):
+    """Start an analysis worker process: analyze and store queued tweets"""
+    client = TwitterClient()
+    try:
+        await client.run_analysis_loop(worker)
+    except KeyboardInterrupt:
+        print(f"Analysis worker {worker} stopped")
+    except Exception as e:
+        print(f"Error in analysis worker {worker}: {e}")
+    finally:
+        # Commit analyses still waiting for a batch
+        airdrop_writer.close()
+        await close_openrouter_client()
+        shutdown_executors(wait=False)
 
 
 if __name__ == "__main__":
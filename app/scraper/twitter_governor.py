@@ -0,0 +1,176 @@
+"""
+Rate-limit-aware governor for AirdropAgent's twikit calls
+Tells rate limits apart from authentication failures, waits out each endpoint's
+rate limit window instead of logging in again, and spaces out login attempts
+"""
+import sys
+import os
+import time
+import asyncio
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from twikit.errors import TooManyRequests, Unauthorized, AccountLocked, AccountSuspended
+from config import (TWITTER_MIN_CALL_INTERVAL_SECONDS, TWITTER_RATE_LIMIT_FALLBACK_SECONDS,
+                    TWITTER_MAX_INLINE_WAIT_SECONDS, TWITTER_LOGIN_BACKOFF_SECONDS, TWITTER_LOGIN_COOLDOWN_MINUTES)
+
+# Error kinds
+ERROR_RATE_LIMIT = 'rate_limit'  # 429 - the session is fine, wait for the window to reset
+ERROR_AUTH = 'auth'              # Session rejected - log in again
+ERROR_OTHER = 'other'            # Network or server trouble - retry later with the same session
+
+# A 403 (Forbidden) is left out - Twitter also returns it for single requests it refuses,
+# and logging in again for each of those would trip the login limits
+AUTH_ERRORS = (Unauthorized, AccountLocked, AccountSuspended)
+
+# Seconds added to a reset time so the first call after it lands in the new window
+RESET_MARGIN_SECONDS = 2
+
+# GraphQL operations and the endpoint kind whose rate limit they share
+ENDPOINT_KINDS = {
+    'SearchTimeline': 'search'
+}
+
+class RateLimited(Exception):
+    def __init__(self, kind, reset_at):
+        """
+        Raised instead of calling an endpoint whose rate limit window is used up
+
+        Args:
+            kind (str): Endpoint kind, e.g. "search"
+            reset_at (float): Unix time at which calls are allowed again
+        """
+        super().__init__(f"{kind} rate limit reached, resets in {max(0, reset_at - time.time()):.0f}s")
+        self.kind = kind
+        self.reset_at = reset_at
+
+def classify_error(error):
+    """
+    Get the kind of a twikit call failure
+
+    Returns:
+        str: ERROR_RATE_LIMIT, ERROR_AUTH or ERROR_OTHER
+    """
+    if isinstance(error, (TooManyRequests, RateLimited)):
+        return ERROR_RATE_LIMIT
+    if isinstance(error, AUTH_ERRORS):
+        return ERROR_AUTH
+    return ERROR_OTHER
+
+def endpoint_kind(url_path):
+    """Map a request path to the endpoint kind whose rate limit it uses"""
+    operation = url_path.rstrip('/').rsplit('/', 1)[-1]
+    return ENDPOINT_KINDS.get(operation, operation)
+
+class TwitterGovernor:
+    def __init__(self, min_interval=TWITTER_MIN_CALL_INTERVAL_SECONDS,
+                 fallback_wait=TWITTER_RATE_LIMIT_FALLBACK_SECONDS, max_inline_wait=TWITTER_MAX_INLINE_WAIT_SECONDS,
+                 login_backoff=TWITTER_LOGIN_BACKOFF_SECONDS, login_cooldown_minutes=TWITTER_LOGIN_COOLDOWN_MINUTES,
+                 on_rate_limit=None):
+        """
+        Create a governor
+
+        Args:
+            min_interval (float): Minimum seconds between calls to the same endpoint kind
+            fallback_wait (float): Wait after a 429 that carries no reset time, in seconds
+            max_inline_wait (float): Calls sleep through shorter waits; longer ones raise RateLimited
+            login_backoff (float): Wait after the first failed login - doubles for each failure in a row
+            login_cooldown_minutes (float): Wait once max_attempts logins failed in a row
+            on_rate_limit (callable, optional): Called with (kind, remaining, limit, reset) for every
+                response carrying rate limit headers
+        """
+        self.min_interval = min_interval
+        self.fallback_wait = fallback_wait
+        self.max_inline_wait = max_inline_wait
+        self.login_backoff = login_backoff
+        self.login_cooldown = login_cooldown_minutes * 60
+        self.on_rate_limit = on_rate_limit
+        self.limits = {}          # Kind -> {remaining, limit, reset} from the latest response
+        self.blocked_until = {}   # Kind -> Unix time before which no call is made
+        self.last_call = {}       # Kind -> Unix time of the latest call
+        self.rate_limited_total = 0
+        self._locks = {}
+
+    def attach(self, http_client):
+        """Watch the rate limit headers of every response of twikit's httpx client"""
+        http_client.event_hooks['response'].append(self._track_response)
+
+    async def _track_response(self, response):
+        """Record the rate limit headers of a response"""
+        headers = response.headers
+        if 'x-rate-limit-remaining' not in headers:
+            return
+        kind = endpoint_kind(response.url.path)
+        remaining = int(headers['x-rate-limit-remaining'])
+        limit = int(headers.get('x-rate-limit-limit', 0))
+        reset = int(headers.get('x-rate-limit-reset', 0))
+        self.limits[kind] = {'remaining': remaining, 'limit': limit, 'reset': reset}
+
+        # Window used up - hold further calls until it resets rather than collecting a 429
+        if remaining <= 0 and reset:
+            self.block(kind, reset + RESET_MARGIN_SECONDS)
+        if self.on_rate_limit:
+            self.on_rate_limit(kind, remaining, limit, reset)
+
+    def block(self, kind, until):
+        """Allow no calls of an endpoint kind before the given Unix time"""
+        self.blocked_until[kind] = max(self.blocked_until.get(kind, 0), until)
+
+    def seconds_until_allowed(self, kind):
+        """Get the wait before the endpoint kind may be called (0 if it may be called now)"""
+        return max(0, self.blocked_until.get(kind, 0) - time.time())
+
+    async def call(self, kind, func, *args, **kwargs):
+        """
+        Call a twikit coroutine function within its endpoint's limits
+
+        Args:
+            kind (str): Endpoint kind, e.g. "search"
+            func (coroutine function): twikit call
+            *args, **kwargs: Arguments for func
+
+        Returns:
+            The result of func
+
+        Raises:
+            RateLimited: The endpoint stays blocked for longer than max_inline_wait
+        """
+        lock = self._locks.setdefault(kind, asyncio.Lock())
+        async with lock:
+            wait = self.seconds_until_allowed(kind)
+            if wait > self.max_inline_wait:
+                raise RateLimited(kind, self.blocked_until[kind])
+
+            # Space out calls to the same endpoint
+            wait = max(wait, self.last_call.get(kind, 0) + self.min_interval - time.time())
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.last_call[kind] = time.time()
+
+        try:
+            return await func(*args, **kwargs)
+        except TooManyRequests as e:
+            self.rate_limited_total += 1
+            reset = e.rate_limit_reset or time.time() + self.fallback_wait
+            self.block(kind, reset + RESET_MARGIN_SECONDS)
+            print(f"Twitter {kind} rate limit hit - pausing {kind} calls for "
+                  f"{self.seconds_until_allowed(kind):.0f}s")
+            raise
+
+    def login_failed(self, attempts, max_attempts):
+        """
+        Hold off the next login after a failure
+
+        Args:
+            attempts (int): Failed logins in a row
+            max_attempts (int): Failures after which logins pause for the cooldown
+
+        Returns:
+            bool: True if the cooldown started - the caller should reset its attempt counter
+        """
+        if attempts >= max_attempts:
+            self.block('login', time.time() + self.login_cooldown)
+            print(f"{attempts} logins failed in a row - next login in {self.login_cooldown / 60:.0f} minutes")
+            return True
+        self.block('login', time.time() + self.login_backoff * 2 ** (attempts - 1))
+        return False
@@ -3,46 +3,67 @@
 """
 import sys
 import os
-import time
 import re
+import atexit
+import asyncio
 import requests
 from urllib.parse import urlparse
 from datetime import datetime
-import socket
-import whois
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:  # Only where lxml cannot be installed - html.parser is several times slower
+    HTML_PARSER = 'html.parser'
 
 # Add root directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from config import SCRAPE_MAX_BYTES
+from app.executor import run_blocking, get_executor
+from app.scraper.scrape_cache import scrape_cache, hash_content
+from app.scraper.whois_lookup import whois_lookup, STATUS_ERROR
+from app.scraper.dom_index import DomIndex
+from app.scraper.browser_pool import BrowserPool, wait_until_ready, wait_for_network_idle
+
+if HTML_PARSER == 'lxml':
+    print("Parsing pages with lxml")
+else:
+    print("WARNING: lxml is not installed - parsing pages with the slower html.parser (pip install lxml)")
+
+# Common section identifiers (matched case-insensitively against ids, classes and headings)
+ABOUT_KEYWORDS = ['about', 'overview', 'introduction', 'project']
+TEAM_KEYWORDS = ['team', 'members', 'founders', 'core team', 'our team', 'about us']
+TOKENOMICS_KEYWORDS = ['tokenomics', 'token', 'distribution', 'allocation', 'supply', 'economics']
+MEMBER_CLASS_KEYWORDS = ['team-member', 'member', 'profile', 'person']
+
+# Content types worth parsing
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Top-level tags the extractors never read - children of skipped html/head
+# tags are still considered, so <meta> and <body> are kept
+HEAD_ONLY_TAGS = {'html', 'head', 'title', 'script', 'style', 'link', 'noscript', 'template', 'base'}
+PARSE_ONLY = SoupStrainer(lambda name, attrs: name not in HEAD_ONLY_TAGS)
+
+# Precompiled patterns
+WHITESPACE_PATTERN = re.compile(r'\s+')
+ROLE_CLASS_PATTERN = re.compile(r'role|position|title', re.I)
+# "(total|max|circulating)? supply: 1,000" - the optional prefix never decides whether there is a match
+SUPPLY_PATTERN = re.compile(r'supply\s*:?\s*[\d,]+', re.I)
 
 def get_domain_age(domain):
     """Get domain age in days"""
-    try:
-        # Remove protocol and path
-        if '//' in domain:
-            domain = domain.split('//')[1]
-        domain = domain.split('/')[0]
-        
-        w = whois.whois(domain)
-        
-        # Handle multiple creation dates
-        if isinstance(w.creation_date, list):
-            creation_date = w.creation_date[0]
-        else:
-            creation_date = w.creation_date
-        
-        if creation_date:
-            days_old = (datetime.now() - creation_date).days
-            return f"{days_old} days ({creation_date.strftime('%Y-%m-%d')})"
-        else:
-            return "Unknown"
-    except Exception as e:
-        print(f"Error getting domain age: {e}")
+    creation_date, status = whois_lookup.lookup(domain)
+    
+    if creation_date:
+        days_old = (datetime.now() - creation_date).days
+        return f"{days_old} days ({creation_date.strftime('%Y-%m-%d')})"
+    elif status == STATUS_ERROR:
         return "Error retrieving"
+    else:
+        return "Unknown"
 
 def setup_driver(headless=True):
     """Set up Chrome WebDriver"""
@@ -67,100 +88,126 @@ def setup_driver(headless=True):
     driver.set_page_load_timeout(30)  # 30 seconds timeout
     return driver
 
+# Warm browsers shared by all scrapes (started on first use)
+browser_pool = BrowserPool(lambda: setup_driver(headless=True))
+atexit.register(browser_pool.close_all)
+
+def render_page(url):
+    """Load a page in a pooled headless browser and return the rendered HTML"""
+    with browser_pool.lease() as driver:
+        driver.get(url)
+        wait_until_ready(driver)
+        
+        # Scroll down to load lazy content, then wait for it to arrive
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        wait_for_network_idle(driver)
+        
+        return driver.page_source
+
+def _as_index(soup):
+    """Get a DomIndex for a parsed page (extractors accept either)"""
+    return soup if isinstance(soup, DomIndex) else DomIndex(soup)
+
+class _SectionCollector:
+    """
+    Collects extracted text sections up to the 1000 character output limit
+    Once full, further sections cannot change the result, so extraction can stop early
+    """
+    def __init__(self, limit=1000):
+        self.limit = limit
+        self.sections = []
+        self.length = -1
+    
+    @property
+    def full(self):
+        return self.length > self.limit
+    
+    def add(self, text):
+        # Collapse whitespace per section - the same as collapsing the joined text
+        text = WHITESPACE_PATTERN.sub(' ', text).strip()
+        if text and not self.full:
+            self.sections.append(text)
+            self.length += len(text) + 1
+    
+    def __bool__(self):
+        return bool(self.sections)
+    
+    def text(self):
+        text = ' '.join(self.sections)
+        
+        # Truncate if too long
+        if len(text) > self.limit:
+            text = text[:self.limit - 3] + "..."
+        return text
+
 def extract_about_section(soup, url):
     """Extract about section from website"""
-    about_sections = []
-    
-    # Common about section identifiers
-    about_keywords = ['about', 'overview', 'introduction', 'project']
+    index = _as_index(soup)
+    about_sections = _SectionCollector()
     
     # Try to find about section by ID or class
-    for keyword in about_keywords:
+    for keyword in ABOUT_KEYWORDS:
         # Try id
-        about_element = soup.find(id=re.compile(f".*{keyword}.*", re.I))
-        if about_element and len(about_element.text.strip()) > 50:
-            about_sections.append(about_element.text.strip())
+        about_element = index.first_with_id(keyword)
+        if about_element and len(index.text(about_element).strip()) > 50:
+            about_sections.add(index.text(about_element))
             
         # Try class
-        about_elements = soup.find_all(class_=re.compile(f".*{keyword}.*", re.I))
-        for element in about_elements:
-            if element and len(element.text.strip()) > 50:
-                about_sections.append(element.text.strip())
+        for element in index.all_with_class(keyword):
+            if about_sections.full:
+                break
+            if len(index.text(element).strip()) > 50:
+                about_sections.add(index.text(element))
     
     # Look for sections with about heading
-    headings = soup.find_all(['h1', 'h2', 'h3', 'h4'])
-    for heading in headings:
-        if any(keyword in heading.text.lower() for keyword in about_keywords):
-            # Get the next siblings until the next heading
-            content = []
-            for sibling in heading.find_next_siblings():
-                if sibling.name in ['h1', 'h2', 'h3', 'h4']:
-                    break
-                if sibling.text.strip():
-                    content.append(sibling.text.strip())
-            if content:
-                about_sections.append(' '.join(content))
+    if not about_sections.full:
+        for section in index.heading_sections(ABOUT_KEYWORDS):
+            about_sections.add(section)
     
     # If no specific about section found, use meta description
     if not about_sections:
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
+        meta_desc = index.meta_description
         if meta_desc and 'content' in meta_desc.attrs:
-            about_sections.append(meta_desc['content'])
+            about_sections.add(meta_desc['content'])
     
     # If still nothing, grab the first paragraphs
     if not about_sections:
-        paragraphs = soup.find_all('p')
-        relevant_paragraphs = [p.text.strip() for p in paragraphs[:5] if len(p.text.strip()) > 50]
-        about_sections.extend(relevant_paragraphs)
-    
-    # Combine and clean
-    about_text = ' '.join(about_sections)
-    about_text = re.sub(r'\s+', ' ', about_text).strip()
-    
-    # Truncate if too long
-    if len(about_text) > 1000:
-        about_text = about_text[:997] + "..."
+        for p in index.paragraphs[:5]:
+            if len(index.text(p).strip()) > 50:
+                about_sections.add(index.text(p))
     
+    about_text = about_sections.text()
     return about_text if about_text else f"No about information found on {url}"
 
 def extract_team_info(soup):
     """Extract team information from website"""
-    team_sections = []
-    
-    # Common team section identifiers
-    team_keywords = ['team', 'members', 'founders', 'core team', 'our team', 'about us']
+    index = _as_index(soup)
+    team_sections = _SectionCollector()
     
     # Try to find team section by ID or class
-    for keyword in team_keywords:
+    for keyword in TEAM_KEYWORDS:
         # Try id
-        team_element = soup.find(id=re.compile(f".*{keyword}.*", re.I))
+        team_element = index.first_with_id(keyword)
         if team_element:
-            team_sections.append(team_element.text.strip())
+            team_sections.add(index.text(team_element))
             
         # Try class
-        team_elements = soup.find_all(class_=re.compile(f".*{keyword}.*", re.I))
-        for element in team_elements:
-            team_sections.append(element.text.strip())
+        for element in index.all_with_class(keyword):
+            if team_sections.full:
+                break
+            team_sections.add(index.text(element))
     
     # Look for sections with team heading
-    headings = soup.find_all(['h1', 'h2', 'h3', 'h4'])
-    for heading in headings:
-        if any(keyword in heading.text.lower() for keyword in team_keywords):
-            # Get the next siblings until the next heading
-            content = []
-            for sibling in heading.find_next_siblings():
-                if sibling.name in ['h1', 'h2', 'h3', 'h4']:
-                    break
-                if sibling.text.strip():
-                    content.append(sibling.text.strip())
-            if content:
-                team_sections.append(' '.join(content))
+    if not team_sections.full:
+        for section in index.heading_sections(TEAM_KEYWORDS):
+            team_sections.add(section)
     
     # Extract team members specifically
     team_members = []
     
     # Look for common team member structures
-    member_elements = soup.find_all(class_=re.compile(r'team-member|member|profile|person', re.I))
+    member_elements = [] if team_sections.full else index.all_with_class(*MEMBER_CLASS_KEYWORDS)
     for element in member_elements:
         name = None
         role = None
@@ -168,14 +215,16 @@ def extract_team_info(soup):
         # Try to find name and role
         name_elem = element.find(['h3', 'h4', 'h5', 'strong', 'b'])
         if name_elem:
-            name = name_elem.text.strip()
+            name = index.text(name_elem).strip()
         
         # Try to find role
-        role_elem = element.find(['p', 'span', 'div'], class_=re.compile(r'role|position|title', re.I))
+        role_elem = element.find(['p', 'span', 'div'], class_=ROLE_CLASS_PATTERN)
         if role_elem:
-            role = role_elem.text.strip()
-        elif name and element.find('p'):
-            role = element.find('p').text.strip()
+            role = index.text(role_elem).strip()
+        elif name:
+            paragraph = element.find('p')
+            if paragraph:
+                role = index.text(paragraph).strip()
         
         if name:
             member_info = name
@@ -185,149 +234,234 @@ def extract_team_info(soup):
     
     # Add team members to sections
     if team_members:
-        team_sections.append("Team Members: " + ", ".join(team_members))
-    
-    # Combine and clean
-    team_info = ' '.join(team_sections)
-    team_info = re.sub(r'\s+', ' ', team_info).strip()
-    
-    # Truncate if too long
-    if len(team_info) > 1000:
-        team_info = team_info[:997] + "..."
+        team_sections.add("Team Members: " + ", ".join(team_members))
     
+    team_info = team_sections.text()
     return team_info if team_info else "No team information found"
 
 def extract_tokenomics(soup):
     """Extract tokenomics information from website"""
-    tokenomics_sections = []
-    
-    # Common tokenomics section identifiers
-    tokenomics_keywords = ['tokenomics', 'token', 'distribution', 'allocation', 'supply', 'economics']
+    index = _as_index(soup)
+    tokenomics_sections = _SectionCollector()
     
     # Try to find tokenomics section by ID or class
-    for keyword in tokenomics_keywords:
+    for keyword in TOKENOMICS_KEYWORDS:
         # Try id
-        tokenomics_element = soup.find(id=re.compile(f".*{keyword}.*", re.I))
+        tokenomics_element = index.first_with_id(keyword)
         if tokenomics_element:
-            tokenomics_sections.append(tokenomics_element.text.strip())
+            tokenomics_sections.add(index.text(tokenomics_element))
             
         # Try class
-        tokenomics_elements = soup.find_all(class_=re.compile(f".*{keyword}.*", re.I))
-        for element in tokenomics_elements:
-            tokenomics_sections.append(element.text.strip())
+        for element in index.all_with_class(keyword):
+            if tokenomics_sections.full:
+                break
+            tokenomics_sections.add(index.text(element))
     
     # Look for sections with tokenomics heading
-    headings = soup.find_all(['h1', 'h2', 'h3', 'h4'])
-    for heading in headings:
-        if any(keyword in heading.text.lower() for keyword in tokenomics_keywords):
-            # Get the next siblings until the next heading
-            content = []
-            for sibling in heading.find_next_siblings():
-                if sibling.name in ['h1', 'h2', 'h3', 'h4']:
-                    break
-                if sibling.text.strip():
-                    content.append(sibling.text.strip())
-            if content:
-                tokenomics_sections.append(' '.join(content))
+    if not tokenomics_sections.full:
+        for section in index.heading_sections(TOKENOMICS_KEYWORDS):
+            tokenomics_sections.add(section)
     
     # Look for specific tokenomics patterns
-    supply_pattern = re.compile(r'(total|max|circulating)?\s*supply\s*:?\s*[\d,]+', re.I)
-    supply_matches = []
-    for tag in soup.find_all(['p', 'div', 'span', 'li']):
-        if supply_pattern.search(tag.text):
-            supply_matches.append(tag.text.strip())
-    
-    if supply_matches:
-        tokenomics_sections.append("Supply information: " + " | ".join(supply_matches))
-    
-    # Combine and clean
-    tokenomics_info = ' '.join(tokenomics_sections)
-    tokenomics_info = re.sub(r'\s+', ' ', tokenomics_info).strip()
-    
-    # Truncate if too long
-    if len(tokenomics_info) > 1000:
-        tokenomics_info = tokenomics_info[:997] + "..."
+    if not tokenomics_sections.full:
+        supply_matches = [index.text(tag).strip() for tag in index.supply_blocks()
+                          if SUPPLY_PATTERN.search(index.text(tag))]
+        
+        if supply_matches:
+            tokenomics_sections.add("Supply information: " + " | ".join(supply_matches))
     
+    tokenomics_info = tokenomics_sections.text()
     return tokenomics_info if tokenomics_info else "No tokenomics information found"
 
-def scrape_website(url):
-    """Scrape website for project information"""
-    if not url:
-        return None
-    
-    domain = urlparse(url).netloc
-    
-    # Get domain age
-    domain_age = get_domain_age(domain)
+def extract_project_info(soup, url):
+    """Extract about, team and tokenomics information from a parsed page in one indexing pass"""
+    index = _as_index(soup)
+    return {
+        'about_text': extract_about_section(index, url),
+        'team_info': extract_team_info(index),
+        'tokenomics': extract_tokenomics(index)
+    }
+
+def _charset(response):
+    """Get the charset declared in the Content-Type header, if any"""
+    for param in response.headers.get('Content-Type', '').split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+def fetch_html(url, headers):
+    """
+    Download a page with a size ceiling
+    The body is streamed and the download stops at SCRAPE_MAX_BYTES, so huge
+    bundles or endless responses never sit in memory
+    
+    Returns:
+        tuple: (response, body bytes) - body is None for non-200 or non-HTML responses
+    """
+    response = requests.get(url, headers=headers, timeout=10, stream=True)
+    try:
+        if response.status_code != 200:
+            return response, None
+        
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            return response, None
+        
+        declared_length = response.headers.get('Content-Length')
+        if declared_length and declared_length.isdigit() and int(declared_length) > SCRAPE_MAX_BYTES:
+            print(f"{url} is {declared_length} bytes, reading only the first {SCRAPE_MAX_BYTES}")
+        
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            received += len(chunk)
+            if received >= SCRAPE_MAX_BYTES:
+                print(f"Stopped reading {url} at {SCRAPE_MAX_BYTES} bytes")
+                break
+        
+        return response, b''.join(chunks)[:SCRAPE_MAX_BYTES]
+    finally:
+        # Closing drops any unread remainder of the body
+        response.close()
+
+def parse_html(markup, encoding=None):
+    """
+    Parse page markup with the fastest available parser, skipping head-only
+    tags (scripts, styles, links) that the extractors never read
+    
+    Args:
+        markup (bytes or str): Page markup
+        encoding (str, optional): Charset declared by the server for byte markup
+    """
+    if isinstance(markup, bytes) and encoding:
+        return BeautifulSoup(markup, HTML_PARSER, parse_only=PARSE_ONLY, from_encoding=encoding)
+    return BeautifulSoup(markup, HTML_PARSER, parse_only=PARSE_ONLY)
+
+def scrape_page(url):
+    """Scrape website content for project information (without domain age)"""
+    # Serve fresh cache entries without touching the network
+    cached = scrape_cache.lookup(url)
+    if cached and scrape_cache.is_fresh(cached):
+        scrape_cache.record(hit=True)
+        return dict(cached['result'])
     
     try:
         # First try with requests (faster)
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        response = requests.get(url, headers=headers, timeout=10)
+        
+        # Revalidate stale entries with a conditional GET
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        response, body = fetch_html(url, headers)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        
+        if response.status_code == 304 and cached:
+            scrape_cache.revalidated(cached, etag, last_modified)
+            scrape_cache.record(hit=True)
+            return dict(cached['result'])
         
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
+            if body is None:
+                content_type = response.headers.get('Content-Type', 'unknown')
+                print(f"Skipping {url}: unsupported content type {content_type}")
+                return {
+                    'about_text': f"Failed to access website: unsupported content type {content_type}",
+                    'team_info': "Not available",
+                    'tokenomics': "Not available"
+                }
             
-            about_text = extract_about_section(soup, url)
-            team_info = extract_team_info(soup)
-            tokenomics = extract_tokenomics(soup)
+            # Unchanged page content - skip extraction entirely
+            content_hash = hash_content(body)
+            if cached and cached['content_hash'] == content_hash:
+                scrape_cache.revalidated(cached, etag, last_modified)
+                scrape_cache.record(hit=True)
+                return dict(cached['result'])
             
-            return {
-                'about_text': about_text,
-                'team_info': team_info,
-                'tokenomics': tokenomics,
-                'domain_age': domain_age
-            }
+            scrape_cache.record(hit=False)
+            soup = parse_html(body, _charset(response))
+            
+            result = extract_project_info(soup, url)
+            scrape_cache.store(url, result, etag, last_modified, content_hash)
+            return result
         
-        # If requests fails, try with Selenium
+        # If requests fails, try with a pooled headless browser
         print(f"Requests failed with status {response.status_code}, trying Selenium")
-        driver = setup_driver(headless=True)
         
         try:
-            driver.get(url)
-            time.sleep(5)  # Wait for JavaScript to load
-            
-            # Scroll down to load lazy content
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-            time.sleep(2)
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            
-            about_text = extract_about_section(soup, url)
-            team_info = extract_team_info(soup)
-            tokenomics = extract_tokenomics(soup)
-            
-            return {
-                'about_text': about_text,
-                'team_info': team_info,
-                'tokenomics': tokenomics,
-                'domain_age': domain_age
-            }
-            
+            page_source = render_page(url)
         except Exception as e:
             print(f"Selenium scraping error: {e}")
             return {
                 'about_text': f"Failed to load content: {str(e)}",
                 'team_info': "Not available",
-                'tokenomics': "Not available",
-                'domain_age': domain_age
+                'tokenomics': "Not available"
             }
-        finally:
-            driver.quit()
+        
+        content_hash = hash_content(page_source)
+        if cached and cached['content_hash'] == content_hash:
+            scrape_cache.revalidated(cached)
+            scrape_cache.record(hit=True)
+            return dict(cached['result'])
+        
+        scrape_cache.record(hit=False)
+        soup = parse_html(page_source)
+        
+        result = extract_project_info(soup, url)
+        scrape_cache.store(url, result, content_hash=content_hash)
+        return result
             
     except Exception as e:
         print(f"Website scraping error: {e}")
         return {
             'about_text': f"Failed to access website: {str(e)}",
             'team_info': "Not available",
-            'tokenomics': "Not available",
-            'domain_age': domain_age
+            'tokenomics': "Not available"
         }
 
+def scrape_website(url):
+    """Scrape website for project information"""
+    if not url:
+        return None
+    
+    domain = urlparse(url).netloc
+    
+    # Get domain age in the WHOIS pool while the page is downloaded
+    domain_age_future = get_executor('whois').submit(get_domain_age, domain)
+    
+    website_data = scrape_page(url)
+    website_data['domain_age'] = domain_age_future.result()
+    return website_data
+
+async def get_domain_age_async(domain):
+    """Get domain age without blocking the event loop"""
+    return await run_blocking('whois', get_domain_age, domain)
+
+async def scrape_website_async(url):
+    """
+    Scrape website for project information without blocking the event loop
+    The WHOIS lookup runs in parallel with the page scrape, each in its own thread pool
+    """
+    if not url:
+        return None
+    
+    domain = urlparse(url).netloc
+    
+    domain_age, website_data = await asyncio.gather(
+        get_domain_age_async(domain),
+        run_blocking('scrape', scrape_page, url)
+    )
+    website_data['domain_age'] = domain_age
+    return website_data
+
 if __name__ == "__main__":
     # Test the scraper with a sample URL
     test_url = "https://example.com"
@@ -0,0 +1,182 @@
+"""
+WHOIS lookups for AirdropAgent
+Caches creation dates per registered domain, caches failures briefly, and
+spaces out queries to each TLD's WHOIS servers
+"""
+import sys
+import os
+import time
+import weakref
+import threading
+from datetime import datetime, timezone
+import whois
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from config import (WHOIS_CACHE_TTL_DAYS, WHOIS_NEGATIVE_TTL_MINUTES, WHOIS_TLD_MIN_INTERVAL_SECONDS,
+                    WHOIS_MEMORY_ENTRIES)
+from app.cache import LRUCache
+import database
+
+CACHE_NAME = 'whois'
+
+# Lookup outcomes
+STATUS_OK = 'ok'            # Creation date found
+STATUS_UNKNOWN = 'unknown'  # Registry answered without a creation date
+STATUS_ERROR = 'error'      # Lookup failed
+
+# Second-level suffixes under which names are registered one label deeper
+MULTI_PART_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'com.au', 'net.au', 'org.au', 'co.nz', 'co.jp', 'ne.jp',
+    'com.br', 'com.cn', 'com.hk', 'com.sg', 'com.tr', 'co.in', 'co.kr', 'com.mx',
+    'co.id', 'or.id', 'ac.id', 'web.id', 'my.id', 'biz.id'
+}
+
+def registered_domain(host):
+    """
+    Get the registered domain for a host name or URL
+
+    Args:
+        host (str): Host name, netloc or URL (e.g. "https://app.example.co.uk/path")
+
+    Returns:
+        str: Registered domain (e.g. "example.co.uk")
+    """
+    host = host.lower()
+    if '//' in host:
+        host = host.split('//')[1]
+    host = host.split('/')[0].split(':')[0].strip('.')
+
+    labels = host.split('.')
+    if len(labels) > 2 and '.'.join(labels[-2:]) in MULTI_PART_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+def _to_naive_utc(value):
+    """Normalize a WHOIS date so it can be compared with datetime.now()"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+class WhoisLookup:
+    def __init__(self, ttl_days=WHOIS_CACHE_TTL_DAYS, negative_ttl_minutes=WHOIS_NEGATIVE_TTL_MINUTES,
+                 tld_min_interval=WHOIS_TLD_MIN_INTERVAL_SECONDS, memory_entries=WHOIS_MEMORY_ENTRIES):
+        """
+        Create the lookup service
+
+        Args:
+            ttl_days (float): How long a found (or missing) creation date is cached
+            negative_ttl_minutes (float): How long a failed lookup is cached
+            tld_min_interval (float): Minimum seconds between queries to the same TLD
+            memory_entries (int): Maximum domains kept in memory
+        """
+        self.ttl_seconds = ttl_days * 86400
+        self.negative_ttl_seconds = negative_ttl_minutes * 60
+        self.tld_min_interval = tld_min_interval
+        self._memory = LRUCache(memory_entries)
+        self._locks_lock = threading.Lock()
+        # A domain's lock lives only while a lookup holds or waits for it
+        self._domain_locks = weakref.WeakValueDictionary()
+        self._tld_next_slot = {}  # TLD -> earliest Unix time of its next query
+
+    def _domain_lock(self, domain):
+        """Get the lock for a domain, creating it if needed"""
+        with self._locks_lock:
+            lock = self._domain_locks.get(domain)
+            if lock is None:
+                lock = self._domain_locks[domain] = threading.Lock()
+            return lock
+
+    def _is_valid(self, entry):
+        """Check whether a cached entry is still usable"""
+        ttl = self.negative_ttl_seconds if entry['status'] == STATUS_ERROR else self.ttl_seconds
+        return time.time() - entry['checked_at'] < ttl
+
+    def _cached(self, domain):
+        """Get a usable cached entry from memory or the database"""
+        entry = self._memory.get(domain)
+        if entry is None:
+            try:
+                entry = database.get_whois_cache_entry(domain)
+            except Exception as e:
+                print(f"WHOIS cache read error: {e}")
+                entry = None
+            if entry:
+                self._memory.put(domain, entry)
+        return entry if entry and self._is_valid(entry) else None
+
+    def _throttle(self, tld):
+        """Wait until the TLD's WHOIS servers may be queried again"""
+        # Reserve the next free slot under the lock, then sleep without holding it
+        with self._locks_lock:
+            now = time.time()
+            slot = max(now, self._tld_next_slot.get(tld, 0))
+            self._tld_next_slot[tld] = slot + self.tld_min_interval
+            # Forget TLDs whose interval has passed so the map only holds recently queried ones
+            if len(self._tld_next_slot) > 100:
+                self._tld_next_slot = {key: value for key, value in self._tld_next_slot.items() if value > now}
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _query(self, domain):
+        """Run a WHOIS query and return (creation date ISO text or None, status)"""
+        self._throttle(domain.rsplit('.', 1)[-1])
+        try:
+            w = whois.whois(domain)
+
+            # Handle multiple creation dates
+            if isinstance(w.creation_date, list):
+                creation_date = w.creation_date[0]
+            else:
+                creation_date = w.creation_date
+
+            if isinstance(creation_date, datetime):
+                return _to_naive_utc(creation_date).isoformat(), STATUS_OK
+            return None, STATUS_UNKNOWN
+        except Exception as e:
+            print(f"Error getting domain age: {e}")
+            return None, STATUS_ERROR
+
+    def _query_and_store(self, domain):
+        """Query WHOIS and cache the outcome"""
+        creation_date, status = self._query(domain)
+        entry = {'domain': domain, 'creation_date': creation_date, 'status': status, 'checked_at': time.time()}
+        self._memory.put(domain, entry)
+        try:
+            database.save_whois_cache_entry(domain, creation_date, status)
+        except Exception as e:
+            print(f"WHOIS cache write error: {e}")
+        return entry
+
+    def lookup(self, host):
+        """
+        Get the creation date of a host's registered domain
+
+        Args:
+            host (str): Host name, netloc or URL
+
+        Returns:
+            tuple: (creation datetime or None, status)
+        """
+        domain = registered_domain(host)
+        queried = False
+
+        entry = self._cached(domain)
+        if entry is None:
+            # Only one thread queries a given domain - the others wait for its result
+            with self._domain_lock(domain):
+                entry = self._cached(domain)
+                if entry is None:
+                    entry = self._query_and_store(domain)
+                    queried = True
+
+        try:
+            database.record_cache_lookup(CACHE_NAME, hit=not queried)
+        except Exception as e:
+            print(f"WHOIS cache stats error: {e}")
+
+        creation_date = entry['creation_date']
+        return (datetime.fromisoformat(creation_date) if creation_date else None), entry['status']
+
+# Shared lookup service
+whois_lookup = WhoisLookup()
@@ -0,0 +1,185 @@
+"""
+Process supervisor for AirdropAgent
+Runs each role (web, ingestion, analysis) in its own worker processes and restarts
+crashed workers with exponential backoff, giving up on a worker that keeps crashing
+"""
+import sys
+import os
+import time
+import signal
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (SUPERVISOR_RESTART_BACKOFF_SECONDS, SUPERVISOR_MAX_BACKOFF_SECONDS, SUPERVISOR_STABLE_SECONDS,
+                    SUPERVISOR_MAX_RESTARTS, SUPERVISOR_RESTART_WINDOW_SECONDS, SUPERVISOR_SHUTDOWN_TIMEOUT_SECONDS)
+
+# Longest the supervisor sleeps between checks when nothing is due
+MAX_WAIT_SECONDS = 5.0
+
+def _stop(signum, frame):
+    """Turn SIGTERM into KeyboardInterrupt so cleanup code runs"""
+    raise KeyboardInterrupt
+
+def handle_stop_signals():
+    """Make SIGTERM stop the current process the same way Ctrl+C does"""
+    signal.signal(signal.SIGTERM, _stop)
+
+def _run_worker(target, args):
+    """Entry point of every worker process"""
+    handle_stop_signals()
+    try:
+        target(*args)
+    except KeyboardInterrupt:
+        pass
+
+class Supervisor:
+    def __init__(self, backoff=SUPERVISOR_RESTART_BACKOFF_SECONDS, max_backoff=SUPERVISOR_MAX_BACKOFF_SECONDS,
+                 stable_seconds=SUPERVISOR_STABLE_SECONDS, max_restarts=SUPERVISOR_MAX_RESTARTS,
+                 restart_window=SUPERVISOR_RESTART_WINDOW_SECONDS, shutdown_timeout=SUPERVISOR_SHUTDOWN_TIMEOUT_SECONDS,
+                 log=print):
+        """
+        Create a supervisor
+
+        Args:
+            backoff (float): Delay before the first restart of a crashed worker, in seconds
+            max_backoff (float): Longest restart delay - the delay doubles for each crash in a row
+            stable_seconds (float): Uptime after which a worker's crash streak is forgotten
+            max_restarts (int): Restarts allowed per worker within restart_window before giving up
+            restart_window (float): Window for max_restarts, in seconds
+            shutdown_timeout (float): Wait for workers to exit on shutdown before killing them
+            log (callable): Receives status messages
+        """
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable_seconds = stable_seconds
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.shutdown_timeout = shutdown_timeout
+        self.log = log
+        self.workers = []
+        # Spawn rather than fork - the parent may already run threads
+        self._context = multiprocessing.get_context('spawn')
+
+    def add(self, role, target, count=1, args=(), pass_name=False):
+        """
+        Register a role
+
+        Args:
+            role (str): Role name, e.g. "analysis"
+            target (callable): Module-level function run in each worker process
+            count (int): Number of worker processes for this role
+            args (tuple): Arguments for target
+            pass_name (bool): Append the worker's name (e.g. "analysis-2") to the arguments
+        """
+        for number in range(1, count + 1):
+            name = f"{role}-{number}" if count > 1 else role
+            self.workers.append({
+                'role': role,
+                'name': name,
+                'target': target,
+                'args': tuple(args) + ((name,) if pass_name else ()),
+                'process': None,
+                'started_at': None,
+                'next_start': 0,
+                'crash_streak': 0,
+                'restarts': deque(),
+                'given_up': False
+            })
+
+    def _start(self, worker):
+        """Start a worker's process"""
+        process = self._context.Process(target=_run_worker, args=(worker['target'], worker['args']),
+                                        name=worker['name'], daemon=False)
+        process.start()
+        worker['process'] = process
+        worker['started_at'] = time.monotonic()
+        self.log(f"Started {worker['name']} (pid {process.pid})")
+
+    def _handle_exit(self, worker):
+        """Schedule the restart of a worker whose process exited"""
+        process = worker['process']
+        now = time.monotonic()
+        uptime = now - worker['started_at']
+        worker['process'] = None
+
+        if uptime >= self.stable_seconds:
+            worker['crash_streak'] = 0
+        worker['crash_streak'] += 1
+
+        restarts = worker['restarts']
+        while restarts and now - restarts[0] > self.restart_window:
+            restarts.popleft()
+        if len(restarts) >= self.max_restarts:
+            worker['given_up'] = True
+            self.log(f"{worker['name']} exited with code {process.exitcode} after {uptime:.0f}s - "
+                     f"restarted {len(restarts)} times in {self.restart_window:.0f}s, giving up")
+            return
+
+        delay = min(self.backoff * 2 ** (worker['crash_streak'] - 1), self.max_backoff)
+        restarts.append(now)
+        worker['next_start'] = now + delay
+        self.log(f"{worker['name']} exited with code {process.exitcode} after {uptime:.0f}s - "
+                 f"restarting in {delay:.1f}s")
+
+    def status(self):
+        """
+        Get the state of every worker
+
+        Returns:
+            list: Dicts with name, role, pid, alive, restarts and given_up
+        """
+        return [{
+            'name': worker['name'],
+            'role': worker['role'],
+            'pid': worker['process'].pid if worker['process'] else None,
+            'alive': bool(worker['process'] and worker['process'].is_alive()),
+            'restarts': len(worker['restarts']),
+            'given_up': worker['given_up']
+        } for worker in self.workers]
+
+    def run(self):
+        """Start every worker and keep them running until interrupted"""
+        handle_stop_signals()
+        try:
+            while True:
+                now = time.monotonic()
+                for worker in self.workers:
+                    if worker['process'] is None and not worker['given_up'] and now >= worker['next_start']:
+                        self._start(worker)
+
+                running = [worker for worker in self.workers if worker['process'] is not None]
+                if not running and all(worker['given_up'] for worker in self.workers):
+                    self.log("Every worker has given up - stopping")
+                    return
+
+                # Sleep until a worker exits or a restart is due
+                due = [worker['next_start'] - now for worker in self.workers
+                       if worker['process'] is None and not worker['given_up']]
+                timeout = max(0, min(due + [MAX_WAIT_SECONDS]))
+                sentinels = {worker['process'].sentinel: worker for worker in running}
+                for sentinel in wait(list(sentinels), timeout):
+                    worker = sentinels[sentinel]
+                    worker['process'].join()
+                    self._handle_exit(worker)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop every worker, killing the ones that do not exit in time"""
+        running = [worker for worker in self.workers if worker['process'] is not None]
+        for worker in running:
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        for worker in running:
+            process = worker['process']
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                self.log(f"{worker['name']} did not stop in time - killing it")
+                process.kill()
+                process.join()
+            worker['process'] = None
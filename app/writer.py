@@ -0,0 +1,132 @@
+"""
+Write-behind persistence for AirdropAgent
+Analyses are queued and written in batches by one background thread, so analysis
+workers never wait for a commit and many rows share each disk sync
+"""
+import sys
+import os
+import time
+import queue
+import atexit
+import threading
+from concurrent.futures import Future
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL_SECONDS
+import database
+
+# Queue markers
+_FLUSH = object()
+_STOP = object()
+
+class WriteBehindWriter:
+    def __init__(self, write_batch, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL_SECONDS,
+                 name='writer'):
+        """
+        Create a writer
+
+        Args:
+            write_batch (callable): Writes a list of items in one transaction and returns
+                one result per item
+            batch_size (int): Maximum items per batch
+            flush_interval (float): Longest an item waits for its batch to fill, in seconds
+            name (str): Thread name suffix
+        """
+        self.write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.name = name
+        self.batches_written = 0
+        self.items_written = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        """Start the writer thread on first use"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"airdrop-{self.name}", daemon=True)
+                self._thread.start()
+
+    def submit(self, item):
+        """
+        Queue an item for writing
+
+        Returns:
+            Future: Resolves to the item's write result (e.g. its row ID)
+        """
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((item, future))
+        return future
+
+    def flush(self, timeout=None):
+        """Write everything queued so far and wait until it is committed"""
+        if self._thread is None:
+            return
+        done = Future()
+        self._queue.put((_FLUSH, done))
+        done.result(timeout)
+
+    def close(self, timeout=None):
+        """Write everything queued so far and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put((_STOP, None))
+        thread.join(timeout)
+
+    def _write(self, batch):
+        """Write a batch and resolve its futures"""
+        if not batch:
+            return
+        items = [item for item, _ in batch]
+        try:
+            results = self.write_batch(items)
+        except Exception as e:
+            print(f"Write-behind batch of {len(batch)} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches_written += 1
+        self.items_written += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _run(self):
+        """Collect items into batches until stopped"""
+        while True:
+            item, future = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+
+            # Gather until the batch is full, the oldest item has waited long enough, or a marker arrives
+            while item is not _FLUSH and item is not _STOP:
+                batch.append((item, future))
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    item = None
+                    break
+                try:
+                    item, future = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    item = None
+                    break
+
+            self._write(batch)
+
+            if item is _FLUSH:
+                future.set_result(None)
+            elif item is _STOP:
+                return
+
+# Shared writer for analysis results
+airdrop_writer = WriteBehindWriter(database.save_analysis_batch)
+
+# Don't lose queued analyses when the process exits
+atexit.register(airdrop_writer.close)
@@ -19,9 +19,127 @@
 DATABASE_PATH = "data/airdrops.db"
 
 # Scraping settings
-SEARCH_INTERVAL_MINUTES = 30
-TWEETS_PER_SEARCH = 15
+SEARCH_INTERVAL_MINUTES = 30  # Starting interval of each search query - the scheduler adapts it
+TWEETS_PER_SEARCH = 15  # Tweets requested per search results page
 
 # Admin credentials for web interface
 ADMIN_USERNAME = "admin"
-ADMIN_PASSWORD = "password123"  # Change this in production 
\ No newline at end of file
+ADMIN_PASSWORD = "password123"  # Change this in production 
+
+# Processing pipeline settings (number of workers per stage)
+PIPELINE_SCRAPE_WORKERS = 4
+PIPELINE_ANALYZE_WORKERS = 3
+PIPELINE_PERSIST_WORKERS = 1
+PIPELINE_QUEUE_SIZE = 50  # Maximum items waiting in front of each stage
+
+# Thread pools for blocking I/O run outside the asyncio event loop (threads per pool)
+EXECUTOR_POOL_SIZES = {
+    'scrape': 8,    # requests + BeautifulSoup + Selenium
+    'whois': 4,     # WHOIS lookups
+    'llm': 4,       # OpenRouter calls
+    'database': 2   # SQLite writes
+}
+
+# OpenRouter connection pool settings
+OPENROUTER_MAX_CONNECTIONS = 8        # Maximum concurrent connections to the OpenRouter host
+OPENROUTER_MAX_KEEPALIVE = 4          # Idle connections kept open for reuse
+OPENROUTER_KEEPALIVE_SECONDS = 60     # How long an idle connection stays open
+OPENROUTER_HTTP2 = True               # Multiplex requests over HTTP/2 when the h2 package is installed
+OPENROUTER_TIMEOUT_SECONDS = 30
+
+# LLM response cache settings
+LLM_CACHE_TTL_HOURS = 24          # Cached analyses older than this are re-analyzed
+LLM_CACHE_MAX_ENTRIES = 5000      # Maximum analyses kept in the database
+LLM_CACHE_MEMORY_ENTRIES = 500    # Maximum analyses kept in memory
+
+# Cache hit/miss counter settings (counters and LLM cache recency are written in batches)
+CACHE_STATS_FLUSH_LOOKUPS = 200      # Write the counters after this many lookups
+CACHE_STATS_FLUSH_SECONDS = 60       # ... or once this long has passed since the last write
+
+# Website scrape cache settings
+SCRAPE_CACHE_TTL_MINUTES = 360      # Cached pages are served without a request for this long
+SCRAPE_CACHE_MAX_ENTRIES = 2000     # Maximum pages kept in the database
+SCRAPE_CACHE_MEMORY_ENTRIES = 200   # Maximum pages kept in memory
+
+# WHOIS lookup settings
+WHOIS_CACHE_TTL_DAYS = 30             # Creation dates are re-checked after this long
+WHOIS_NEGATIVE_TTL_MINUTES = 30       # Failed lookups are not retried for this long
+WHOIS_TLD_MIN_INTERVAL_SECONDS = 2.0  # Minimum delay between queries to the same TLD's servers
+WHOIS_MEMORY_ENTRIES = 1000           # Maximum domains kept in memory
+
+# Website fetch settings
+SCRAPE_MAX_BYTES = 2 * 1024 * 1024  # Stop downloading a page after this many bytes
+
+# Headless browser pool settings (Selenium fallback for pages requests cannot load)
+BROWSER_POOL_SIZE = 2                 # Maximum browsers running at once
+BROWSER_MAX_PAGES = 50                # Restart a browser after this many pages
+BROWSER_MAX_RSS_MB = 800              # Restart a browser above this memory use (needs psutil)
+BROWSER_LEASE_TIMEOUT_SECONDS = 60    # How long a scrape waits for a free browser
+BROWSER_READY_TIMEOUT_SECONDS = 15    # Maximum wait for a page to finish loading
+BROWSER_NETWORK_IDLE_MS = 500         # Page counts as settled after this long without new requests
+
+# SQLite connection settings
+DB_POOL_SIZE = 8             # Idle connections kept open for reuse
+DB_BUSY_TIMEOUT_MS = 5000    # How long a writer waits for the write lock
+DB_CACHE_SIZE_KB = 16384     # Page cache per connection
+DB_MMAP_SIZE_MB = 256        # Memory-mapped I/O for reads
+
+# Write-behind settings for analysis results
+WRITE_BATCH_SIZE = 20                 # Analyses written per transaction at most
+WRITE_FLUSH_INTERVAL_SECONDS = 2.0    # Longest an analysis waits for its batch to fill
+
+# API settings
+API_MAX_PAGE_SIZE = 100               # Most rows /api/airdrops/recent returns per page
+RESPONSE_CACHE_ENTRIES = 256          # Rendered pages and API payloads kept in memory
+
+# Dashboard live feed settings
+STREAM_POLL_SECONDS = 2.0             # How often the broadcaster checks for new analyses
+STREAM_HEARTBEAT_SECONDS = 15         # Keep-alive comment interval for idle connections
+STREAM_REPLAY_EVENTS = 200            # Recent events kept for Last-Event-ID resume
+STREAM_CLIENT_QUEUE_SIZE = 100        # Events buffered per client before it is disconnected
+STREAM_MAX_CLIENTS = 8                # Live-feed connections per server process - each holds a request thread,
+                                      # so keep it below SERVER_THREADS; more get 503 and retry later
+
+# Analytics settings
+ANALYTICS_DEFAULT_BUCKETS = {'hour': 48, 'day': 90}    # Buckets charted when the client asks for no range
+ANALYTICS_MAX_BUCKETS = 800                            # Longest range a single request may cover
+
+# Web serving settings
+SERVER_MODE = "threaded"              # dev (Flask development server), threaded (waitress) or prefork (gunicorn)
+SERVER_THREADS = 16                   # Request threads (per worker process in prefork mode)
+SERVER_WORKERS = 4                    # Worker processes in prefork mode
+
+# Process supervisor settings (main.py)
+INGEST_WORKERS = 1                    # Processes searching Twitter and queueing tweets (one per account session)
+ANALYSIS_WORKERS = 2                  # Processes scraping, analyzing and storing queued tweets
+SUPERVISOR_RESTART_BACKOFF_SECONDS = 2      # First restart delay - doubles after each crash in a row
+SUPERVISOR_MAX_BACKOFF_SECONDS = 300        # Longest restart delay
+SUPERVISOR_STABLE_SECONDS = 300             # A worker up this long counts as healthy again
+SUPERVISOR_MAX_RESTARTS = 10                # Restarts allowed per worker within the window below
+SUPERVISOR_RESTART_WINDOW_SECONDS = 3600    # Window for SUPERVISOR_MAX_RESTARTS
+SUPERVISOR_SHUTDOWN_TIMEOUT_SECONDS = 10    # Wait for workers to exit before killing them
+
+# Analysis job queue settings
+JOB_CLAIM_BATCH = 10                  # Tweets an analysis worker claims at a time
+JOB_POLL_SECONDS = 5                  # Idle analysis workers check the queue this often
+JOB_LEASE_SECONDS = 900               # A claimed tweet returns to the queue if not finished by then
+JOB_MAX_ATTEMPTS = 3                  # Tries per tweet before its job is marked failed
+
+# Twitter search settings
+SEARCH_QUERIES = ['#airdrop', '#cryptoairdrop', '"claim airdrop"', '"token airdrop"']    # Searched concurrently each cycle
+SEARCH_MAX_PAGES = 5                  # Result pages followed per query when no already seen tweet turns up
+SEARCH_CONCURRENCY = 2                # Queries in flight at once
+
+# Adaptive search scheduling (per query)
+SEARCH_MIN_INTERVAL_SECONDS = 120     # Shortest interval between searches of one query
+SEARCH_MAX_INTERVAL_SECONDS = 3600    # Longest interval between searches of one query
+SEARCH_TARGET_YIELD = 10              # New tweets a search should find - busy queries run more often
+SEARCH_YIELD_SMOOTHING = 0.3          # Weight of the latest search in the yield averages
+SEARCH_RATE_LIMIT_RESERVE = 0.2       # Share of the search rate limit left unused
+
+# Twitter call governor
+TWITTER_MIN_CALL_INTERVAL_SECONDS = 1.0       # Minimum delay between calls to the same endpoint
+TWITTER_RATE_LIMIT_FALLBACK_SECONDS = 900     # Pause after a 429 that carries no reset time
+TWITTER_MAX_INLINE_WAIT_SECONDS = 30          # Calls wait out shorter rate limit pauses, longer ones are rescheduled
+TWITTER_LOGIN_BACKOFF_SECONDS = 60            # Wait after a failed login - doubles for each failure in a row
+TWITTER_LOGIN_COOLDOWN_MINUTES = 360          # Pause after max login attempts failed in a row
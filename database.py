@@ -3,72 +3,652 @@
 """
 import sqlite3
 import os
+import atexit
+import json
+import re
+import time
+import queue
 import datetime
-from config import DATABASE_PATH
+import threading
+from contextlib import contextmanager
+from config import (DATABASE_PATH, DB_POOL_SIZE, DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE_MB,
+                    CACHE_STATS_FLUSH_LOOKUPS, CACHE_STATS_FLUSH_SECONDS)
+
+# Columns of the airdrops table that API clients may select
+AIRDROP_FIELDS = ('id', 'project_name', 'username', 'tweet_text', 'tweet_url', 'website_url', 'rating',
+                  'analysis', 'is_scam', 'is_legitimate', 'timestamp', 'created_at', 'tweet_id')
+
+# Characters that mark the matched words in search snippets
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+# Words of a search query
+SEARCH_WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Tweet ID in a tweet URL (https://twitter.com/<user>/status/<id>)
+TWEET_URL_ID_PATTERN = re.compile(r'/status(?:es)?/(\d+)')
+
+# Rating above which the analyzer calls a project legitimate
+LEGITIMATE_RATING = 7.5
+
+# Analysis job states
+JOB_PENDING = 'pending'    # Waiting for an analysis worker
+JOB_RUNNING = 'running'    # Claimed by a worker
+JOB_FAILED = 'failed'      # Gave up after too many attempts
 
 # Ensure data directory exists
 os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
 
-def init_db():
-    """Initialize the SQLite database"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+def _connect():
+    """Open a connection with WAL journaling and the tuned PRAGMAs"""
+    # Connections move between threads through the pool, but only one thread uses a connection at a time
+    conn = sqlite3.connect(DATABASE_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    
+    # WAL lets the dashboard read while the monitor commits
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    # Negative cache_size is in KiB
+    conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE_MB) * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+class ConnectionPool:
+    def __init__(self, size=DB_POOL_SIZE):
+        """
+        Pool of reusable SQLite connections
+        
+        Args:
+            size (int): Maximum idle connections kept open; busier moments open extra ones
+        """
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+    
+    def _check_pid(self):
+        """Drop connections inherited from a parent process - they must not be shared across fork"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._idle = queue.LifoQueue()
+                    self._pid = os.getpid()
+    
+    def acquire(self):
+        """Get an idle connection or open a new one"""
+        self._check_pid()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _connect()
+    
+    def release(self, conn):
+        """Return a connection to the pool, closing it if the pool is full"""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._pid != os.getpid() or self._idle.qsize() >= self.size:
+            conn.close()
+            return
+        self._idle.put(conn)
+    
+    def close_all(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+# Shared connection pool
+pool = ConnectionPool()
+
+# Cache counters and LLM cache recency waiting to be written (see record_cache_lookup)
+_counters_lock = threading.Lock()
+_pending_lookups = {}      # Cache name -> [hits, misses]
+_pending_last_used = {}    # LLM cache key -> Unix time of the latest hit
+_last_counters_flush = time.monotonic()
+
+@contextmanager
+def get_connection():
+    """
+    Borrow a pooled connection
+    
+    Uncommitted changes are rolled back when the block exits, so callers commit explicitly.
+    Rows are sqlite3.Row objects (index and key access).
+    """
+    conn = pool.acquire()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+def _ensure_column(cursor, table, column, definition):
+    """Add a column to an existing table if it is missing"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _migrate_tweet_id(cursor):
+    """Tweet ID column with a uniqueness constraint so the same tweet is never stored twice"""
+    _ensure_column(cursor, 'airdrops', 'tweet_id', 'TEXT')
+    
+    # Rows stored before the column existed carry the ID in their URL (.../status/<id>).
+    # Only the oldest copy of a tweet stored twice gets it, so the unique index can be built
+    cursor.execute("SELECT tweet_id FROM airdrops WHERE tweet_id IS NOT NULL")
+    taken = {row[0] for row in cursor.fetchall()}
+    cursor.execute("SELECT id, tweet_url FROM airdrops WHERE tweet_id IS NULL ORDER BY id")
+    backfill = []
+    for airdrop_id, tweet_url in cursor.fetchall():
+        match = TWEET_URL_ID_PATTERN.search(tweet_url or '')
+        if match and match.group(1) not in taken:
+            taken.add(match.group(1))
+            backfill.append((match.group(1), airdrop_id))
+    cursor.executemany("UPDATE airdrops SET tweet_id = ? WHERE id = ?", backfill)
     
-    # Create airdrops table
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_airdrops_tweet_id ON airdrops (tweet_id)')
+
+def _migrate_filter_columns(cursor):
+    """created_at and is_legitimate columns used by the verified and scam alert pages"""
+    _ensure_column(cursor, 'airdrops', 'created_at', 'DATETIME')
+    _ensure_column(cursor, 'airdrops', 'is_legitimate', 'BOOLEAN')
+    
+    # Existing rows were stored when they were analyzed, and the analyzer calls
+    # a project legitimate above the same rating threshold
+    cursor.execute("UPDATE airdrops SET created_at = timestamp WHERE created_at IS NULL")
+    cursor.execute(f'''
+    UPDATE airdrops SET is_legitimate = CASE WHEN rating > {LEGITIMATE_RATING} THEN 1 ELSE 0 END
+    WHERE is_legitimate IS NULL
+    ''')
+
+def _migrate_dashboard_indexes(cursor):
+    """Indexes for the dashboard, stats, filter and detail queries"""
+    # Recent airdrops, newest first
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_airdrops_timestamp ON airdrops (timestamp, id)')
+    # Verified and scam alert pages, newest first
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_airdrops_scam_created ON airdrops (is_scam, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_airdrops_legitimate_created ON airdrops (is_legitimate, created_at)')
+    # Website data join on the detail page
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_website_data_project_id ON website_data (project_id)')
+
+def _migrate_stats_summary(cursor):
+    """Stats summary row kept up to date by triggers on airdrops"""
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS airdrops (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        project_name TEXT,
-        username TEXT,
-        tweet_text TEXT,
-        tweet_url TEXT,
-        website_url TEXT,
-        rating REAL,
-        analysis TEXT,
-        is_scam BOOLEAN,
-        timestamp DATETIME
+    CREATE TABLE IF NOT EXISTS stats_summary (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL DEFAULT 0,
+        scam_count INTEGER NOT NULL DEFAULT 0,
+        rating_sum REAL NOT NULL DEFAULT 0,
+        rating_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_airdrops_stats_insert AFTER INSERT ON airdrops
+    BEGIN
+        UPDATE stats_summary SET
+            total = total + 1,
+            scam_count = scam_count + (NEW.is_scam = 1),
+            rating_sum = rating_sum + IFNULL(NEW.rating, 0),
+            rating_count = rating_count + (NEW.rating IS NOT NULL)
+        WHERE id = 1;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_airdrops_stats_delete AFTER DELETE ON airdrops
+    BEGIN
+        UPDATE stats_summary SET
+            total = total - 1,
+            scam_count = scam_count - (OLD.is_scam = 1),
+            rating_sum = rating_sum - IFNULL(OLD.rating, 0),
+            rating_count = rating_count - (OLD.rating IS NOT NULL)
+        WHERE id = 1;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_airdrops_stats_update AFTER UPDATE OF is_scam, rating ON airdrops
+    BEGIN
+        UPDATE stats_summary SET
+            scam_count = scam_count - (OLD.is_scam = 1) + (NEW.is_scam = 1),
+            rating_sum = rating_sum - IFNULL(OLD.rating, 0) + IFNULL(NEW.rating, 0),
+            rating_count = rating_count - (OLD.rating IS NOT NULL) + (NEW.rating IS NOT NULL)
+        WHERE id = 1;
+    END
+    ''')
+    
+    _rebuild_stats_summary(cursor)
+
+def _migrate_data_version(cursor):
+    """Data version counter bumped by triggers on every airdrop or website data change"""
+    _ensure_column(cursor, 'stats_summary', 'data_version', 'INTEGER NOT NULL DEFAULT 0')
+    
+    for table in ('airdrops', 'website_data'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                UPDATE stats_summary SET data_version = data_version + 1 WHERE id = 1;
+            END
+            ''')
+
+def _fts5_available(cursor):
+    """Check whether this SQLite build has the FTS5 extension"""
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(content)")
+        cursor.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def _migrate_search_index(cursor):
+    """Full-text search index over tweets, analyses and scraped website text"""
+    if not _fts5_available(cursor):
+        print("SQLite was built without FTS5 - full-text search is disabled")
+        return
+    
+    # One document per airdrop (rowid = airdrop ID) with the text of all its website rows
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS airdrops_fts USING fts5(
+        project_name, username, tweet_text, analysis, about_text, team_info, tokenomics,
+        tokenize = 'porter unicode61'
     )
     ''')
     
-    # Create website_data table for storing scraped data
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS website_data (
+    CREATE TRIGGER IF NOT EXISTS trg_airdrops_fts_insert AFTER INSERT ON airdrops
+    BEGIN
+        INSERT INTO airdrops_fts (rowid, project_name, username, tweet_text, analysis, about_text, team_info, tokenomics)
+        VALUES (NEW.id, NEW.project_name, NEW.username, NEW.tweet_text, NEW.analysis, '', '', '');
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_airdrops_fts_update AFTER UPDATE OF project_name, username, tweet_text, analysis ON airdrops
+    BEGIN
+        UPDATE airdrops_fts SET project_name = NEW.project_name, username = NEW.username,
+                                tweet_text = NEW.tweet_text, analysis = NEW.analysis
+        WHERE rowid = NEW.id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_airdrops_fts_delete AFTER DELETE ON airdrops
+    BEGIN
+        DELETE FROM airdrops_fts WHERE rowid = OLD.id;
+    END
+    ''')
+    
+    # Website rows are re-aggregated into their airdrop's document on every change
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_website_data_fts_{event.lower()} AFTER {event} ON website_data
+        BEGIN
+            UPDATE airdrops_fts SET
+                about_text = IFNULL((SELECT group_concat(about_text, ' ') FROM website_data WHERE project_id = {row}.project_id), ''),
+                team_info = IFNULL((SELECT group_concat(team_info, ' ') FROM website_data WHERE project_id = {row}.project_id), ''),
+                tokenomics = IFNULL((SELECT group_concat(tokenomics, ' ') FROM website_data WHERE project_id = {row}.project_id), '')
+            WHERE rowid = {row}.project_id;
+        END
+        ''')
+    
+    _rebuild_search_index(cursor)
+
+# Rollup periods and the strftime format of their bucket keys
+ROLLUP_PERIODS = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d'
+}
+
+# Rating histogram bins of width 1 (a 10 falls into the last bin)
+RATING_BINS = 10
+
+# Kinds of names counted per rollup bucket
+ROLLUP_NAME_KINDS = ('username', 'domain')
+
+def _rating_bin_sql(rating):
+    """SQL expression for the histogram bin of a rating"""
+    return f"MIN(MAX(CAST({rating} AS INTEGER), 0), {RATING_BINS - 1})"
+
+def _domain_sql(url):
+    """SQL expression for the host name of a URL, without port or www."""
+    host = f"lower(CASE WHEN instr({url}, '://') > 0 THEN substr({url}, instr({url}, '://') + 3) ELSE {url} END)"
+    for separator in ('/', '?', ':'):
+        host = f"(CASE WHEN instr({host}, '{separator}') > 0 THEN substr({host}, 1, instr({host}, '{separator}') - 1) ELSE {host} END)"
+    return f"(CASE WHEN {host} LIKE 'www.%' THEN substr({host}, 5) ELSE {host} END)"
+
+def _rollup_name_sql(kind, row):
+    """SQL expression for the counted name of a row (username or website domain)"""
+    if kind == 'username':
+        return f"lower({row}.username)"
+    return _domain_sql(f"{row}.website_url")
+
+def _rollup_trigger_body(row, sign):
+    """Trigger statements that add (sign 1) or remove (sign -1) a row from every rollup"""
+    statements = []
+    for period, bucket_format in ROLLUP_PERIODS.items():
+        bucket = f"strftime('{bucket_format}', {row}.timestamp)"
+        rating_bin = _rating_bin_sql(f"{row}.rating")
+        histogram = ', '.join(
+            f"rating_bin_{number} = rating_bin_{number} + {sign} * ({row}.rating IS NOT NULL AND {rating_bin} = {number})"
+            for number in range(RATING_BINS)
+        )
+        statements.append(f"INSERT OR IGNORE INTO airdrop_rollups (period, bucket) SELECT '{period}', {bucket} WHERE {bucket} IS NOT NULL")
+        statements.append(f'''
+            UPDATE airdrop_rollups SET
+                total = total + {sign},
+                scam_count = scam_count + {sign} * ({row}.is_scam = 1),
+                legitimate_count = legitimate_count + {sign} * ({row}.is_legitimate = 1),
+                rating_sum = rating_sum + {sign} * IFNULL({row}.rating, 0),
+                rating_count = rating_count + {sign} * ({row}.rating IS NOT NULL),
+                {histogram}
+            WHERE period = '{period}' AND bucket = {bucket}''')
+        
+        for kind in ROLLUP_NAME_KINDS:
+            name = _rollup_name_sql(kind, row)
+            statements.append(f'''
+            INSERT OR IGNORE INTO airdrop_rollup_names (period, bucket, kind, name)
+            SELECT '{period}', {bucket}, '{kind}', {name} WHERE {bucket} IS NOT NULL AND length({name}) > 0''')
+            statements.append(f'''
+            UPDATE airdrop_rollup_names SET
+                total = total + {sign},
+                scam_count = scam_count + {sign} * ({row}.is_scam = 1)
+            WHERE period = '{period}' AND bucket = {bucket} AND kind = '{kind}' AND name = {name}''')
+    return ';\n'.join(statements) + ';'
+
+def _migrate_rollups(cursor):
+    """Hourly and daily rollups (counts, rating histogram, top usernames and domains) kept by triggers"""
+    histogram_columns = ',\n'.join(f"        rating_bin_{number} INTEGER NOT NULL DEFAULT 0" for number in range(RATING_BINS))
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS airdrop_rollups (
+        period TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        scam_count INTEGER NOT NULL DEFAULT 0,
+        legitimate_count INTEGER NOT NULL DEFAULT 0,
+        rating_sum REAL NOT NULL DEFAULT 0,
+        rating_count INTEGER NOT NULL DEFAULT 0,
+{histogram_columns},
+        PRIMARY KEY (period, bucket)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS airdrop_rollup_names (
+        period TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        scam_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (period, kind, bucket, name)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_airdrops_rollup_insert AFTER INSERT ON airdrops
+    BEGIN
+        {_rollup_trigger_body('NEW', 1)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_airdrops_rollup_delete AFTER DELETE ON airdrops
+    BEGIN
+        {_rollup_trigger_body('OLD', -1)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_airdrops_rollup_update
+    AFTER UPDATE OF username, website_url, rating, is_scam, is_legitimate, timestamp ON airdrops
+    BEGIN
+        {_rollup_trigger_body('OLD', -1)}
+        {_rollup_trigger_body('NEW', 1)}
+    END
+    ''')
+    
+    _rebuild_rollups(cursor)
+
+def _migrate_analysis_jobs(cursor):
+    """Job queue handing fetched tweets from the ingestion process to the analysis workers"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS analysis_jobs (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
-        project_id INTEGER,
-        about_text TEXT,
-        team_info TEXT,
-        tokenomics TEXT,
-        domain_age TEXT,
-        timestamp DATETIME,
-        FOREIGN KEY (project_id) REFERENCES airdrops (id)
+        tweet_id TEXT NOT NULL UNIQUE,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker TEXT,
+        claimed_at REAL,
+        created_at REAL,
+        error TEXT
     )
     ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs (status, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_jobs_worker ON analysis_jobs (worker)')
+
+def _migrate_search_watermarks(cursor):
+    """Newest tweet seen by each search query, so searches resume where they left off"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS search_watermarks (
+        query TEXT PRIMARY KEY,
+        tweet_id INTEGER NOT NULL,
+        tweet_at TEXT,
+        updated_at REAL
+    )
+    ''')
+
+def _migrate_search_schedule(cursor):
+    """Adaptive interval and new-tweet yield of each search query"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS search_schedule (
+        query TEXT PRIMARY KEY,
+        interval_seconds REAL,
+        next_run_at REAL,
+        last_run_at REAL,
+        last_yield INTEGER,
+        yield_avg REAL,
+        rate_avg REAL,
+        pages_avg REAL,
+        runs INTEGER,
+        updated_at REAL
+    )
+    ''')
+
+# Schema upgrades in order - the database's PRAGMA user_version is the number applied so far
+MIGRATIONS = [
+    _migrate_tweet_id,
+    _migrate_filter_columns,
+    _migrate_dashboard_indexes,
+    _migrate_stats_summary,
+    _migrate_data_version,
+    _migrate_search_index,
+    _migrate_rollups,
+    _migrate_analysis_jobs,
+    _migrate_search_watermarks,
+    _migrate_search_schedule
+]
+
+def _compute_stats(cursor):
+    """Aggregate the summary values from the airdrops table with full scans"""
+    cursor.execute('''
+    SELECT COUNT(*), IFNULL(SUM(is_scam = 1), 0), IFNULL(SUM(rating), 0), COUNT(rating) FROM airdrops
+    ''')
+    return tuple(cursor.fetchone())
+
+def _rebuild_stats_summary(cursor):
+    """Recompute the stats summary row from scratch"""
+    total, scam_count, rating_sum, rating_count = _compute_stats(cursor)
+    cursor.execute('''
+    INSERT OR REPLACE INTO stats_summary (id, total, scam_count, rating_sum, rating_count)
+    VALUES (1, ?, ?, ?, ?)
+    ''', (total, scam_count, rating_sum, rating_count))
+
+def _rebuild_search_index(cursor):
+    """Refill the full-text search index from the airdrops and website_data tables"""
+    cursor.execute("DELETE FROM airdrops_fts")
+    cursor.execute('''
+    INSERT INTO airdrops_fts (rowid, project_name, username, tweet_text, analysis, about_text, team_info, tokenomics)
+    SELECT a.id, a.project_name, a.username, a.tweet_text, a.analysis,
+           IFNULL(group_concat(w.about_text, ' '), ''),
+           IFNULL(group_concat(w.team_info, ' '), ''),
+           IFNULL(group_concat(w.tokenomics, ' '), '')
+    FROM airdrops a
+    LEFT JOIN website_data w ON w.project_id = a.id
+    GROUP BY a.id
+    ''')
+
+def _rebuild_rollups(cursor):
+    """Recompute every rollup bucket from the airdrops table"""
+    cursor.execute("DELETE FROM airdrop_rollups")
+    cursor.execute("DELETE FROM airdrop_rollup_names")
+    
+    rating_bin = _rating_bin_sql('rating')
+    histogram_columns = ', '.join(f"rating_bin_{number}" for number in range(RATING_BINS))
+    histogram_sums = ', '.join(f"SUM(rating IS NOT NULL AND {rating_bin} = {number})" for number in range(RATING_BINS))
     
-    conn.commit()
-    conn.close()
+    for period, bucket_format in ROLLUP_PERIODS.items():
+        bucket = f"strftime('{bucket_format}', timestamp)"
+        cursor.execute(f'''
+        INSERT INTO airdrop_rollups (period, bucket, total, scam_count, legitimate_count, rating_sum, rating_count,
+                                     {histogram_columns})
+        SELECT '{period}', {bucket}, COUNT(*), SUM(is_scam = 1), SUM(is_legitimate = 1), IFNULL(SUM(rating), 0),
+               COUNT(rating), {histogram_sums}
+        FROM airdrops
+        WHERE {bucket} IS NOT NULL
+        GROUP BY {bucket}
+        ''')
+        
+        for kind in ROLLUP_NAME_KINDS:
+            name = _rollup_name_sql(kind, 'airdrops')
+            cursor.execute(f'''
+            INSERT INTO airdrop_rollup_names (period, bucket, kind, name, total, scam_count)
+            SELECT '{period}', {bucket}, '{kind}', {name}, COUNT(*), SUM(is_scam = 1)
+            FROM airdrops
+            WHERE {bucket} IS NOT NULL AND length({name}) > 0
+            GROUP BY {bucket}, {name}
+            ''')
+
+def _migrate(cursor):
+    """Apply the schema upgrades the database has not seen yet"""
+    cursor.execute("PRAGMA user_version")
+    version = cursor.fetchone()[0]
+    
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(cursor)
+        cursor.execute(f"PRAGMA user_version = {number}")
+        print(f"Applied schema migration {number}: {migration.__doc__}")
+
+def init_db():
+    """Initialize the SQLite database"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Create airdrops table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS airdrops (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_name TEXT,
+            username TEXT,
+            tweet_text TEXT,
+            tweet_url TEXT,
+            website_url TEXT,
+            rating REAL,
+            analysis TEXT,
+            is_scam BOOLEAN,
+            timestamp DATETIME
+        )
+        ''')
+        
+        # Create website_data table for storing scraped data
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS website_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER,
+            about_text TEXT,
+            team_info TEXT,
+            tokenomics TEXT,
+            domain_age TEXT,
+            timestamp DATETIME,
+            FOREIGN KEY (project_id) REFERENCES airdrops (id)
+        )
+        ''')
+        
+        # Create llm_cache table for storing model responses by prompt hash
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            cache_key TEXT PRIMARY KEY,
+            result TEXT,
+            created_at REAL,
+            last_used REAL
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)')
+        
+        # Create scrape_cache table for extracted website data and revalidation headers
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_cache (
+            url TEXT PRIMARY KEY,
+            domain TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            result TEXT,
+            fetched_at REAL
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_scrape_cache_fetched_at ON scrape_cache (fetched_at)')
+        
+        # Create whois_cache table for domain creation dates (and recent failures)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS whois_cache (
+            domain TEXT PRIMARY KEY,
+            creation_date TEXT,
+            status TEXT,
+            checked_at REAL
+        )
+        ''')
+        
+        # Create cache_stats table for hit/miss counters of each cache
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_stats (
+            name TEXT PRIMARY KEY,
+            hits INTEGER DEFAULT 0,
+            misses INTEGER DEFAULT 0
+        )
+        ''')
+        
+        # Bring older databases up to the current schema version
+        _migrate(cursor)
+        
+        conn.commit()
     print("Database initialized")
 
 def save_airdrop_analysis(project_name, username, tweet_text, tweet_url, website_url, 
-                          rating, analysis, is_scam, timestamp=None):
-    """Save airdrop analysis to database"""
+                          rating, analysis, is_scam, timestamp=None, tweet_id=None, is_legitimate=None):
+    """Save airdrop analysis to database
+    
+    Returns:
+        int or None: ID of the new row, or None if the tweet was already stored
+    """
     if timestamp is None:
         timestamp = datetime.datetime.now()
+    if is_legitimate is None:
+        is_legitimate = rating is not None and rating > LEGITIMATE_RATING
         
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO airdrops (project_name, username, tweet_text, tweet_url, website_url, 
-                         rating, analysis, is_scam, timestamp)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (project_name, username, tweet_text, tweet_url, website_url, 
-         rating, analysis, is_scam, timestamp))
-    
-    # Get the ID of the inserted row
-    airdrop_id = cursor.lastrowid
-    
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        INSERT OR IGNORE INTO airdrops (project_name, username, tweet_text, tweet_url, website_url, 
+                                        rating, analysis, is_scam, is_legitimate, timestamp, created_at, tweet_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (project_name, username, tweet_text, tweet_url, website_url, 
+             rating, analysis, is_scam, is_legitimate, timestamp, datetime.datetime.now(), tweet_id))
+        
+        # Get the ID of the inserted row (nothing is inserted for an already stored tweet)
+        airdrop_id = cursor.lastrowid if cursor.rowcount else None
+        
+        conn.commit()
     
     return airdrop_id
 
@@ -77,76 +657,435 @@ def save_website_data(project_id, about_text, team_info, tokenomics, domain_age,
     if timestamp is None:
         timestamp = datetime.datetime.now()
     
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        INSERT INTO website_data (project_id, about_text, team_info, tokenomics, domain_age, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (project_id, about_text, team_info, tokenomics, domain_age, timestamp))
+        
+        conn.commit()
+
+def save_analysis_batch(records):
+    """Save a batch of analyses and their website data in a single transaction
     
-    cursor.execute('''
-    INSERT INTO website_data (project_id, about_text, team_info, tokenomics, domain_age, timestamp)
-    VALUES (?, ?, ?, ?, ?, ?)
-    ''', (project_id, about_text, team_info, tokenomics, domain_age, timestamp))
+    Args:
+        records (list): Dicts with the save_airdrop_analysis arguments and an optional
+            website_data dict (about_text, team_info, tokenomics, domain_age)
+        
+    Returns:
+        list: ID of each new airdrop row in record order, None where the tweet was already stored
+    """
+    now = datetime.datetime.now()
+    airdrop_ids = []
+    website_rows = []
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        # One insert per airdrop - each website row needs its airdrop's ID
+        for record in records:
+            rating = record['rating']
+            is_legitimate = record.get('is_legitimate')
+            if is_legitimate is None:
+                is_legitimate = rating is not None and rating > LEGITIMATE_RATING
+            
+            cursor.execute('''
+            INSERT OR IGNORE INTO airdrops (project_name, username, tweet_text, tweet_url, website_url, 
+                                            rating, analysis, is_scam, is_legitimate, timestamp, created_at, tweet_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (record['project_name'], record['username'], record['tweet_text'], record['tweet_url'],
+                 record['website_url'], rating, record['analysis'], record['is_scam'], is_legitimate,
+                 record.get('timestamp') or now, now, record.get('tweet_id')))
+            
+            airdrop_id = cursor.lastrowid if cursor.rowcount else None
+            airdrop_ids.append(airdrop_id)
+            
+            website_data = record.get('website_data')
+            if website_data and airdrop_id:
+                website_rows.append((airdrop_id, website_data.get('about_text', ''), website_data.get('team_info', ''),
+                                     website_data.get('tokenomics', ''), website_data.get('domain_age', ''), now))
+        
+        cursor.executemany('''
+        INSERT INTO website_data (project_id, about_text, team_info, tokenomics, domain_age, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', website_rows)
+        
+        # Piggyback the pending cache counters on this transaction
+        _write_cache_counters(cursor)
+        
+        conn.commit()
     
-    conn.commit()
-    conn.close()
+    return airdrop_ids
+
+def get_seen_tweet_ids():
+    """Get the IDs of all tweets that have already been analyzed"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT tweet_id FROM airdrops WHERE tweet_id IS NOT NULL")
+        tweet_ids = {row[0] for row in cursor.fetchall()}
+    
+    return tweet_ids
 
 def get_recent_airdrops(limit=50):
     """Get recent airdrops from database"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT * FROM airdrops ORDER BY timestamp DESC LIMIT ?
+        ''', (limit,))
+        
+        airdrops = [dict(row) for row in cursor.fetchall()]
     
-    cursor.execute('''
-    SELECT * FROM airdrops ORDER BY timestamp DESC LIMIT ?
-    ''', (limit,))
+    return airdrops
+
+def get_data_version():
+    """Get the counter bumped on every airdrop or website data change
+    
+    Returns:
+        int: Current data version - equal versions mean unchanged data
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT data_version FROM stats_summary WHERE id = 1")
+        row = cursor.fetchone()
+    
+    return row[0] if row else 0
+
+def get_airdrops_page(limit=50, before=None, fields=None):
+    """Get a page of airdrops, newest first, using keyset pagination on (timestamp, id)
+    
+    Args:
+        limit (int): Maximum number of rows
+        before (tuple, optional): (timestamp, id) of the last row of the previous page
+        fields (list, optional): Columns to return (must be in AIRDROP_FIELDS), all if None
+        
+    Returns:
+        tuple: (list of airdrop dictionaries, (timestamp, id) to pass as before for the next
+               page or None if this was the last page)
+    """
+    columns = [field for field in fields if field in AIRDROP_FIELDS] if fields else list(AIRDROP_FIELDS)
+    # The sort key is always selected so the next cursor can be built
+    selected = ', '.join(dict.fromkeys(columns + ['timestamp', 'id']))
+    
+    query = f"SELECT {selected} FROM airdrops"
+    params = []
+    if before is not None:
+        query += " WHERE (timestamp, id) < (?, ?)"
+        params.extend(before)
+    query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    # One extra row tells whether there is a next page
+    params.append(limit + 1)
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    
+    next_before = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_before = (rows[-1]['timestamp'], rows[-1]['id'])
     
-    airdrops = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    airdrops = [{column: row[column] for column in columns} for row in rows]
+    return airdrops, next_before
+
+def get_airdrops_after(last_id, limit=100, fields=None):
+    """Get airdrops stored after a given row, oldest first
+    
+    Args:
+        last_id (int): ID of the last airdrop already seen (0 for all)
+        limit (int): Maximum number of rows
+        fields (list, optional): Columns to return (must be in AIRDROP_FIELDS), all if None
+        
+    Returns:
+        list: Airdrop dictionaries in ID order
+    """
+    columns = [field for field in fields if field in AIRDROP_FIELDS] if fields else list(AIRDROP_FIELDS)
+    selected = ', '.join(dict.fromkeys(['id'] + columns))
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(f"SELECT {selected} FROM airdrops WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit))
+        airdrops = [dict(row) for row in cursor.fetchall()]
     
     return airdrops
 
-def get_airdrop_by_id(airdrop_id):
-    """Get airdrop by ID"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+def get_latest_airdrop_id():
+    """Get the ID of the newest airdrop, 0 if there is none"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT MAX(id) FROM airdrops")
+        latest_id = cursor.fetchone()[0]
     
-    cursor.execute('''
-    SELECT a.*, w.about_text, w.team_info, w.tokenomics, w.domain_age 
-    FROM airdrops a 
-    LEFT JOIN website_data w ON a.id = w.project_id
-    WHERE a.id = ?
-    ''', (airdrop_id,))
+    return latest_id or 0
+
+def build_search_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix
     
-    airdrop = cursor.fetchone()
-    conn.close()
+    Returns:
+        str or None: FTS5 MATCH expression, None if the text has no searchable words
+    """
+    words = SEARCH_WORD_PATTERN.findall(text or '')
+    if not words:
+        return None
+    # Quoting keeps words like AND, OR and NEAR from being read as operators
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def search_airdrops(text, limit=20, offset=0):
+    """Full-text search over project names, tweets, analyses and website text, best matches first
     
-    return dict(airdrop) if airdrop else None
+    Args:
+        text (str): Words to search for
+        limit (int): Maximum number of results
+        offset (int): Number of results to skip
+        
+    Returns:
+        list: Airdrop dictionaries with a snippet of the matching text (marked with
+              SNIPPET_START/SNIPPET_END) and a score (lower is better)
+    """
+    query = build_search_query(text)
+    if query is None:
+        return []
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Matches in the project name and tweet weigh more than matches in website text.
+        # Every match is ranked; ORDER BY rank lets FTS5 sort by bm25 itself, so the
+        # snippet and the join run only for the returned page
+        cursor.execute('''
+        SELECT a.id, a.project_name, a.username, a.website_url, a.rating, a.is_scam, a.timestamp,
+               matches.snippet, matches.score
+        FROM (
+            SELECT rowid, snippet(airdrops_fts, -1, :start, :end, '...', 16) AS snippet, rank AS score
+            FROM airdrops_fts
+            WHERE airdrops_fts MATCH :query AND rank MATCH 'bm25(10.0, 3.0, 5.0, 2.0, 1.0, 1.0, 1.0)'
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        ) AS matches
+        JOIN airdrops a ON a.id = matches.rowid
+        ORDER BY matches.score
+        ''', {'start': SNIPPET_START, 'end': SNIPPET_END, 'query': query, 'limit': limit, 'offset': offset})
+        
+        results = [dict(row) for row in cursor.fetchall()]
+    
+    return results
 
-def get_stats():
-    """Get statistics about airdrops"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+def rebuild_search_index():
+    """Refill the full-text search index from scratch"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        _rebuild_search_index(cursor)
+        
+        conn.commit()
+
+def get_rollup_series(period, start, end):
+    """Get per-bucket counts between two bucket keys
     
-    # Get total count
-    cursor.execute("SELECT COUNT(*) FROM airdrops")
-    total = cursor.fetchone()[0]
+    Args:
+        period (str): 'hour' or 'day'
+        start (str): First bucket key, e.g. '2024-01-01 10:00' or '2024-01-01'
+        end (str): Last bucket key (inclusive)
+        
+    Returns:
+        list: Dicts with bucket, total, scam_count, legitimate_count, avg_rating and the
+              rating histogram (list of RATING_BINS counts), oldest first
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT * FROM airdrop_rollups
+        WHERE period = ? AND bucket BETWEEN ? AND ? AND total > 0
+        ORDER BY bucket
+        ''', (period, start, end))
+        rows = cursor.fetchall()
     
-    # Get scam count
-    cursor.execute("SELECT COUNT(*) FROM airdrops WHERE is_scam = 1")
-    scam_count = cursor.fetchone()[0]
+    series = []
+    for row in rows:
+        series.append({
+            'bucket': row['bucket'],
+            'total': row['total'],
+            'scam_count': row['scam_count'],
+            'legitimate_count': row['legitimate_count'],
+            'avg_rating': row['rating_sum'] / row['rating_count'] if row['rating_count'] else None,
+            'rating_histogram': [row[f'rating_bin_{number}'] for number in range(RATING_BINS)]
+        })
+    return series
+
+def get_rating_histogram(period, start, end):
+    """Get the rating histogram summed over a range of buckets
     
-    # Get avg rating
-    cursor.execute("SELECT AVG(rating) FROM airdrops")
-    avg_rating = cursor.fetchone()[0]
+    Returns:
+        list: RATING_BINS counts, bin n holding ratings from n to n+1 (10 in the last bin)
+    """
+    sums = ', '.join(f"IFNULL(SUM(rating_bin_{number}), 0)" for number in range(RATING_BINS))
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+        SELECT {sums} FROM airdrop_rollups WHERE period = ? AND bucket BETWEEN ? AND ?
+        ''', (period, start, end))
+        histogram = list(cursor.fetchone())
     
-    conn.close()
+    return histogram
+
+def get_top_names(kind, period, start, end, limit=10):
+    """Get the usernames or website domains with the most airdrops in a range of buckets
+    
+    Args:
+        kind (str): 'username' or 'domain'
+        period (str): 'hour' or 'day'
+        start (str): First bucket key
+        end (str): Last bucket key (inclusive)
+        limit (int): Maximum number of names
+        
+    Returns:
+        list: Dicts with name, total and scam_count, most airdrops first
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT name, SUM(total) AS total, SUM(scam_count) AS scam_count
+        FROM airdrop_rollup_names
+        WHERE period = ? AND kind = ? AND bucket BETWEEN ? AND ?
+        GROUP BY name
+        HAVING SUM(total) > 0
+        ORDER BY total DESC, name
+        LIMIT ?
+        ''', (period, kind, start, end, limit))
+        names = [dict(row) for row in cursor.fetchall()]
+    
+    return names
+
+def rebuild_rollups():
+    """Recompute the hourly and daily rollups from the airdrops table"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        _rebuild_rollups(cursor)
+        
+        conn.commit()
+
+def get_airdrop_by_id(airdrop_id):
+    """Get airdrop by ID"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT a.*, w.about_text, w.team_info, w.tokenomics, w.domain_age 
+        FROM airdrops a 
+        LEFT JOIN website_data w ON a.id = w.project_id
+        WHERE a.id = ?
+        ''', (airdrop_id,))
+        
+        airdrop = cursor.fetchone()
+    
+    return dict(airdrop) if airdrop else None
+
+def get_stats():
+    """Get statistics about airdrops from the trigger-maintained summary row"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT total, scam_count, rating_sum, rating_count FROM stats_summary WHERE id = 1")
+        row = cursor.fetchone()
+    
+    total, scam_count, rating_sum, rating_count = tuple(row) if row else (0, 0, 0, 0)
     
     return {
         "total_airdrops": total,
         "scam_count": scam_count,
         "legitimate_count": total - scam_count,
-        "avg_rating": avg_rating if avg_rating else 0
+        "avg_rating": rating_sum / rating_count if rating_count else 0
     }
 
+def check_stats_summary():
+    """Compare the stats summary row with a full aggregation of the airdrops table
+    
+    Returns:
+        tuple: (consistent, stored values, recomputed values)
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT total, scam_count, rating_sum, rating_count FROM stats_summary WHERE id = 1")
+        row = cursor.fetchone()
+        stored = tuple(row) if row else None
+        actual = _compute_stats(cursor)
+    
+    # Rating sums are floats, so allow rounding drift
+    consistent = (stored is not None and stored[0] == actual[0] and stored[1] == actual[1]
+                  and stored[3] == actual[3] and abs(stored[2] - actual[2]) < 1e-6)
+    return consistent, stored, actual
+
+def check_stats_triggers():
+    """Check that the triggers keep the stats summary row in step with writes to the airdrops table
+    
+    Sample rows are inserted, updated and deleted in a transaction that is rolled back, and the
+    change of the summary row is compared with the change of a full aggregation.
+    
+    Returns:
+        tuple: (consistent, change of the stored values, change of the recomputed values)
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT total, scam_count, rating_sum, rating_count FROM stats_summary WHERE id = 1")
+        stored_before = tuple(cursor.fetchone())
+        actual_before = _compute_stats(cursor)
+        
+        ids = []
+        for rating, is_scam, is_legitimate in ((2.5, 1, 0), (8.0, 0, 1), (None, 0, 0)):
+            cursor.execute('''
+            INSERT INTO airdrops (project_name, username, tweet_text, rating, analysis, is_scam, is_legitimate,
+                                  timestamp, created_at)
+            VALUES ('stats check', 'stats_check', 'stats check', ?, '', ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ''', (rating, is_scam, is_legitimate))
+            ids.append(cursor.lastrowid)
+        cursor.execute("UPDATE airdrops SET rating = 6.0, is_scam = 0 WHERE id = ?", (ids[0],))
+        cursor.execute("UPDATE airdrops SET rating = 1.0, is_scam = 1 WHERE id = ?", (ids[2],))
+        cursor.execute("DELETE FROM airdrops WHERE id = ?", (ids[1],))
+        
+        cursor.execute("SELECT total, scam_count, rating_sum, rating_count FROM stats_summary WHERE id = 1")
+        stored_after = tuple(cursor.fetchone())
+        actual_after = _compute_stats(cursor)
+        
+        conn.rollback()
+    
+    stored = tuple(after - before for before, after in zip(stored_before, stored_after))
+    actual = tuple(after - before for before, after in zip(actual_before, actual_after))
+    # Rating sums are floats, so allow rounding drift
+    consistent = (stored[0] == actual[0] and stored[1] == actual[1]
+                  and stored[3] == actual[3] and abs(stored[2] - actual[2]) < 1e-6)
+    return consistent, stored, actual
+
+def rebuild_stats_summary():
+    """Recompute the stats summary row from the airdrops table"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Take the write lock first so no insert lands between the scan and the update
+        cursor.execute("BEGIN IMMEDIATE")
+        _rebuild_stats_summary(cursor)
+        
+        conn.commit()
+
 def get_airdrops_by_filter(is_scam=None, is_legitimate=None, limit=50):
     """Get airdrops filtered by scam or legitimate status
     
@@ -158,34 +1097,577 @@ def get_airdrops_by_filter(is_scam=None, is_legitimate=None, limit=50):
     Returns:
         list: List of airdrop dictionaries matching the filters
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        query = "SELECT * FROM airdrops WHERE 1=1"
+        params = []
+        
+        if is_scam is not None:
+            query += " AND is_scam = ?"
+            params.append(1 if is_scam else 0)
+            
+        if is_legitimate is not None:
+            query += " AND is_legitimate = ?"
+            params.append(1 if is_legitimate else 0)
+        
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        
+        cursor.execute(query, params)
+        airdrops = [dict(row) for row in cursor.fetchall()]
+        
+        # Convert date strings to datetime objects
+        for airdrop in airdrops:
+            if 'created_at' in airdrop and airdrop['created_at']:
+                airdrop['created_at'] = datetime.datetime.fromisoformat(airdrop['created_at'].replace('Z', '+00:00'))
+        
+    return airdrops
+
+def get_llm_cache_entry(cache_key, max_age_seconds):
+    """Get a cached model response
     
-    query = "SELECT * FROM airdrops WHERE 1=1"
-    params = []
+    Args:
+        cache_key (str): Normalized prompt hash
+        max_age_seconds (float): Entries older than this are ignored
+        
+    Returns:
+        tuple or None: (result JSON text, created_at) or None if missing or expired
+    """
+    now = time.time()
     
-    if is_scam is not None:
-        query += " AND is_scam = ?"
-        params.append(1 if is_scam else 0)
+    with get_connection() as conn:
+        cursor = conn.cursor()
         
-    if is_legitimate is not None:
-        query += " AND is_legitimate = ?"
-        params.append(1 if is_legitimate else 0)
+        cursor.execute('''
+        SELECT result, created_at FROM llm_cache WHERE cache_key = ? AND created_at >= ?
+        ''', (cache_key, now - max_age_seconds))
+        row = cursor.fetchone()
     
-    query += " ORDER BY created_at DESC LIMIT ?"
-    params.append(limit)
+    if row:
+        # Recency is written with the next counter flush rather than once per lookup
+        with _counters_lock:
+            _pending_last_used[cache_key] = now
+        
+    return tuple(row) if row else None
+
+def save_llm_cache_entry(cache_key, result, max_entries, max_age_seconds):
+    """Store a model response and evict expired and least recently used entries
     
-    cursor.execute(query, params)
-    airdrops = [dict(row) for row in cursor.fetchall()]
+    Args:
+        cache_key (str): Normalized prompt hash
+        result (str): Analysis result as JSON text
+        max_entries (int): Maximum number of entries kept in the table
+        max_age_seconds (float): Entries older than this are deleted
+    """
+    now = time.time()
     
-    # Convert date strings to datetime objects
-    for airdrop in airdrops:
-        if 'created_at' in airdrop and airdrop['created_at']:
-            airdrop['created_at'] = datetime.datetime.fromisoformat(airdrop['created_at'].replace('Z', '+00:00'))
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        INSERT OR REPLACE INTO llm_cache (cache_key, result, created_at, last_used)
+        VALUES (?, ?, ?, ?)
+        ''', (cache_key, result, now, now))
+        
+        # Eviction goes by last_used - write the pending recency first
+        _write_cache_counters(cursor)
+        
+        cursor.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - max_age_seconds,))
+        cursor.execute('''
+        DELETE FROM llm_cache WHERE cache_key IN (
+            SELECT cache_key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+        )
+        ''', (max_entries,))
+        
+        conn.commit()
+
+def get_scrape_cache_entry(url):
+    """Get the cached scrape of a URL, fresh or stale
     
-    conn.close()
-    return airdrops
+    Returns:
+        dict or None: Row with etag, last_modified, content_hash, result JSON text and fetched_at
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT url, domain, etag, last_modified, content_hash, result, fetched_at
+        FROM scrape_cache WHERE url = ?
+        ''', (url,))
+        row = cursor.fetchone()
+    
+    return dict(row) if row else None
+
+def save_scrape_cache_entry(url, domain, etag, last_modified, content_hash, result, max_entries):
+    """Store the scrape of a URL and evict the oldest entries beyond max_entries"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        INSERT OR REPLACE INTO scrape_cache (url, domain, etag, last_modified, content_hash, result, fetched_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (url, domain, etag, last_modified, content_hash, result, time.time()))
+        
+        cursor.execute('''
+        DELETE FROM scrape_cache WHERE url IN (
+            SELECT url FROM scrape_cache ORDER BY fetched_at DESC LIMIT -1 OFFSET ?
+        )
+        ''', (max_entries,))
+        
+        conn.commit()
+
+def touch_scrape_cache_entry(url, etag, last_modified):
+    """Mark a cached scrape as revalidated"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        UPDATE scrape_cache SET etag = ?, last_modified = ?, fetched_at = ? WHERE url = ?
+        ''', (etag, last_modified, time.time(), url))
+        
+        conn.commit()
+
+def get_whois_cache_entry(domain):
+    """Get the cached WHOIS result for a registered domain
+    
+    Returns:
+        dict or None: Row with creation_date (ISO text or None), status and checked_at
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT domain, creation_date, status, checked_at FROM whois_cache WHERE domain = ?
+        ''', (domain,))
+        row = cursor.fetchone()
+    
+    return dict(row) if row else None
+
+def save_whois_cache_entry(domain, creation_date, status):
+    """Store a WHOIS result for a registered domain"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        INSERT OR REPLACE INTO whois_cache (domain, creation_date, status, checked_at)
+        VALUES (?, ?, ?, ?)
+        ''', (domain, creation_date, status, time.time()))
+        
+        conn.commit()
+
+def _write_cache_counters(cursor):
+    """Add the pending cache counters and LLM cache recency to the database within the caller's transaction"""
+    global _last_counters_flush
+    
+    with _counters_lock:
+        lookups = dict(_pending_lookups)
+        last_used = dict(_pending_last_used)
+        _pending_lookups.clear()
+        _pending_last_used.clear()
+        _last_counters_flush = time.monotonic()
+    
+    cursor.executemany("INSERT OR IGNORE INTO cache_stats (name, hits, misses) VALUES (?, 0, 0)",
+                       [(name,) for name in lookups])
+    cursor.executemany("UPDATE cache_stats SET hits = hits + ?, misses = misses + ? WHERE name = ?",
+                       [(hits, misses, name) for name, (hits, misses) in lookups.items()])
+    cursor.executemany("UPDATE llm_cache SET last_used = MAX(last_used, ?) WHERE cache_key = ?",
+                       [(used, cache_key) for cache_key, used in last_used.items()])
+
+def flush_cache_counters():
+    """Write the pending cache counters and LLM cache recency"""
+    with _counters_lock:
+        if not _pending_lookups and not _pending_last_used:
+            return
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        _write_cache_counters(cursor)
+        
+        conn.commit()
+
+# Write what is left when the process exits
+atexit.register(flush_cache_counters)
+
+def record_cache_lookup(name, hit):
+    """Count a hit or miss for the named cache
+    
+    Counts are kept in memory and written every CACHE_STATS_FLUSH_LOOKUPS lookups,
+    after CACHE_STATS_FLUSH_SECONDS, or with the next analysis batch, whichever comes first.
+    """
+    with _counters_lock:
+        counts = _pending_lookups.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+        pending = sum(hits + misses for hits, misses in _pending_lookups.values())
+        due = (pending >= CACHE_STATS_FLUSH_LOOKUPS or
+               time.monotonic() - _last_counters_flush >= CACHE_STATS_FLUSH_SECONDS)
+    
+    if due:
+        flush_cache_counters()
+
+def get_cache_stats():
+    """Get hit/miss statistics for every cache
+    
+    Returns:
+        dict: Cache name -> {hits, misses, hit_rate}
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT name, hits, misses FROM cache_stats")
+        counts = {name: [hits, misses] for name, hits, misses in cursor.fetchall()}
+    
+    # Include this process's lookups that are not written yet
+    with _counters_lock:
+        for name, (hits, misses) in _pending_lookups.items():
+            total = counts.setdefault(name, [0, 0])
+            total[0] += hits
+            total[1] += misses
+    
+    stats = {}
+    for name, (hits, misses) in counts.items():
+        lookups = hits + misses
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0
+        }
+    
+    return stats
+
+def enqueue_analysis_jobs(records):
+    """Queue fetched tweets for the analysis workers
+    
+    Args:
+        records (list): JSON-serializable tweet records, each with a tweet_id
+        
+    Returns:
+        int: Number of jobs added - tweets already queued (or given up on) are skipped
+    """
+    now = time.time()
+    rows = [(str(record['tweet_id']), json.dumps(record, default=str), now) for record in records]
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        before = conn.total_changes
+        cursor.executemany('''
+        INSERT OR IGNORE INTO analysis_jobs (tweet_id, payload, created_at) VALUES (?, ?, ?)
+        ''', rows)
+        added = conn.total_changes - before
+        
+        conn.commit()
+    
+    return added
+
+def claim_analysis_jobs(worker, limit, lease_seconds):
+    """Claim the oldest pending jobs for a worker
+    
+    Jobs whose worker has held them longer than the lease go back to the queue first,
+    so a crashed worker's tweets are picked up by the others.
+    
+    Args:
+        worker (str): Name of the claiming worker
+        limit (int): Maximum jobs to claim
+        lease_seconds (float): How long a claim lasts before the job may be claimed again
+        
+    Returns:
+        list: Dicts with id, attempts and the queued record
+    """
+    now = time.time()
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Take the write lock first so two workers never claim the same job
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute('''
+        UPDATE analysis_jobs SET status = ?, worker = NULL WHERE status = ? AND claimed_at < ?
+        ''', (JOB_PENDING, JOB_RUNNING, now - lease_seconds))
+        
+        cursor.execute('''
+        SELECT id, attempts, payload FROM analysis_jobs WHERE status = ? ORDER BY id LIMIT ?
+        ''', (JOB_PENDING, limit))
+        jobs = [{'id': row['id'], 'attempts': row['attempts'] + 1, 'record': json.loads(row['payload'])}
+                for row in cursor.fetchall()]
+        
+        cursor.executemany('''
+        UPDATE analysis_jobs SET status = ?, worker = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ?
+        ''', [(JOB_RUNNING, worker, now, job['id']) for job in jobs])
+        
+        conn.commit()
+    
+    return jobs
+
+def complete_analysis_jobs(job_ids):
+    """Remove finished jobs from the queue"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.executemany("DELETE FROM analysis_jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+        
+        conn.commit()
+
+def fail_analysis_job(job_id, error, max_attempts):
+    """Return a job to the queue after an error, or give up on it after max_attempts tries
+    
+    Returns:
+        bool: True if the job will be retried
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        UPDATE analysis_jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, error = ?
+        WHERE id = ?
+        ''', (max_attempts, JOB_FAILED, JOB_PENDING, str(error), job_id))
+        cursor.execute("SELECT status FROM analysis_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        
+        conn.commit()
+    
+    return row is not None and row['status'] == JOB_PENDING
+
+def release_analysis_jobs(worker):
+    """Return the jobs a worker still holds to the queue (used when it restarts)
+    
+    Returns:
+        int: Number of jobs released
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        UPDATE analysis_jobs SET status = ?, worker = NULL WHERE worker = ? AND status = ?
+        ''', (JOB_PENDING, worker, JOB_RUNNING))
+        released = cursor.rowcount
+        
+        conn.commit()
+    
+    return released
+
+def get_analysis_job_counts():
+    """Get the number of queued jobs in each state
+    
+    Returns:
+        dict: State -> number of jobs
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT status, COUNT(*) FROM analysis_jobs GROUP BY status")
+        counts = {JOB_PENDING: 0, JOB_RUNNING: 0, JOB_FAILED: 0}
+        counts.update({status: count for status, count in cursor.fetchall()})
+    
+    return counts
+
+def get_search_watermarks():
+    """Get the newest tweet seen by each search query
+    
+    Returns:
+        dict: Query -> {tweet_id, tweet_at, updated_at}
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT query, tweet_id, tweet_at, updated_at FROM search_watermarks")
+        watermarks = {row['query']: {'tweet_id': row['tweet_id'], 'tweet_at': row['tweet_at'],
+                                     'updated_at': row['updated_at']}
+                      for row in cursor.fetchall()}
+    
+    return watermarks
+
+def save_search_watermarks(watermarks):
+    """Move search query watermarks forward
+    
+    Args:
+        watermarks (dict): Query -> {tweet_id, tweet_at} of the newest tweet handled; a watermark
+            never moves back to an older tweet
+    """
+    now = time.time()
+    rows = [(query, int(mark['tweet_id']), mark.get('tweet_at'), now) for query, mark in watermarks.items()]
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+        INSERT INTO search_watermarks (query, tweet_id, tweet_at, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (query) DO UPDATE SET tweet_id = excluded.tweet_id, tweet_at = excluded.tweet_at,
+                                          updated_at = excluded.updated_at
+        WHERE excluded.tweet_id > search_watermarks.tweet_id
+        ''', rows)
+        
+        conn.commit()
+
+SEARCH_SCHEDULE_FIELDS = ('interval_seconds', 'next_run_at', 'last_run_at', 'last_yield', 'yield_avg', 'rate_avg',
+                          'pages_avg', 'runs')
+
+def get_search_schedule():
+    """Get the stored cadence of each search query
+    
+    Returns:
+        dict: Query -> {interval_seconds, next_run_at, last_run_at, last_yield, yield_avg, rate_avg,
+            pages_avg, runs, updated_at}
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM search_schedule ORDER BY query")
+        schedule = {row['query']: {key: row[key] for key in row.keys() if key != 'query'}
+                    for row in cursor.fetchall()}
+    
+    return schedule
+
+def save_search_schedule(entries):
+    """Store the cadence of search queries
+    
+    Args:
+        entries (list): Dicts with query and the SEARCH_SCHEDULE_FIELDS values
+    """
+    now = time.time()
+    rows = [(entry['query'],) + tuple(entry[key] for key in SEARCH_SCHEDULE_FIELDS) + (now,) for entry in entries]
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.executemany(f'''
+        INSERT OR REPLACE INTO search_schedule (query, {', '.join(SEARCH_SCHEDULE_FIELDS)}, updated_at)
+        VALUES ({', '.join('?' * (len(SEARCH_SCHEDULE_FIELDS) + 2))})
+        ''', rows)
+        
+        conn.commit()
+
+# Dashboard queries and the index (or indexes) each one may use
+QUERY_PLAN_CHECKS = {
+    'recent_airdrops': ("SELECT * FROM airdrops ORDER BY timestamp DESC LIMIT 50",
+                        'idx_airdrops_timestamp'),
+    'recent_airdrops_page': ("SELECT id, rating, timestamp FROM airdrops WHERE (timestamp, id) < ('2024-01-01', 1) "
+                             "ORDER BY timestamp DESC, id DESC LIMIT 51",
+                             'idx_airdrops_timestamp'),
+    'rollup_series': ("SELECT * FROM airdrop_rollups WHERE period = 'day' AND bucket BETWEEN '2024-01-01' AND '2024-03-31' "
+                      "AND total > 0 ORDER BY bucket",
+                      'PRIMARY KEY'),
+    'analysis_jobs_claim': ("SELECT id, attempts, payload FROM analysis_jobs WHERE status = 'pending' ORDER BY id LIMIT 10",
+                            'idx_analysis_jobs_status'),
+    'stats': ("SELECT total, scam_count, rating_sum, rating_count FROM stats_summary WHERE id = 1",
+              'INTEGER PRIMARY KEY'),
+    'verified_projects': ("SELECT * FROM airdrops WHERE 1=1 AND is_legitimate = 1 ORDER BY created_at DESC LIMIT 50",
+                          'idx_airdrops_legitimate_created'),
+    'scam_projects': ("SELECT * FROM airdrops WHERE 1=1 AND is_scam = 1 ORDER BY created_at DESC LIMIT 50",
+                      'idx_airdrops_scam_created'),
+    'airdrop_detail': ('''
+        SELECT a.*, w.about_text, w.team_info, w.tokenomics, w.domain_age 
+        FROM airdrops a 
+        LEFT JOIN website_data w ON a.id = w.project_id
+        WHERE a.id = 1
+        ''', 'idx_website_data_project_id')
+}
+
+def explain_query_plans():
+    """Get the EXPLAIN QUERY PLAN output of the dashboard queries
+    
+    Returns:
+        dict: Query name -> list of plan step descriptions
+    """
+    plans = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        for name, (query, _) in QUERY_PLAN_CHECKS.items():
+            cursor.execute("EXPLAIN QUERY PLAN " + query)
+            plans[name] = [row['detail'] for row in cursor.fetchall()]
+    
+    return plans
+
+def check_query_plans():
+    """Check that every dashboard query uses its index and needs no full scan or sort
+    
+    Returns:
+        list: Problems found, empty if all plans are as expected
+    """
+    problems = []
+    for name, steps in explain_query_plans().items():
+        expected = QUERY_PLAN_CHECKS[name][1]
+        if isinstance(expected, str):
+            expected = (expected,)
+        plan = ' | '.join(steps)
+        
+        if not any(index in plan for index in expected):
+            problems.append(f"{name}: does not use {' or '.join(expected)} ({plan})")
+        for step in steps:
+            if step.startswith('SCAN') and 'INDEX' not in step:
+                problems.append(f"{name}: full table scan ({step})")
+            if 'TEMP B-TREE' in step:
+                problems.append(f"{name}: sorts in a temporary b-tree ({step})")
+    
+    return problems
 
 # Initialize database when module is imported
-init_db() 
\ No newline at end of file
+init_db()
+
+def _print_query_plans():
+    """Print the dashboard query plans, return 1 if any is wrong"""
+    for name, steps in explain_query_plans().items():
+        print(f"{name}:")
+        for step in steps:
+            print(f"    {step}")
+    
+    plan_problems = check_query_plans()
+    for problem in plan_problems:
+        print(f"Query plan problem - {problem}")
+    if plan_problems:
+        return 1
+    print("All query plans use their indexes")
+    return 0
+
+def _check_stats(rebuild=False):
+    """Check the stats summary row, rebuilding it if asked; return 1 if it was inconsistent"""
+    consistent, stored, actual = check_stats_summary()
+    print(f"Stats summary (total, scams, rating sum, ratings): stored {stored}, recomputed {actual}")
+    if rebuild:
+        rebuild_stats_summary()
+        print("Stats summary rebuilt")
+        return 0
+    if not consistent:
+        print("Stats summary is inconsistent - run 'python database.py rebuild-stats'")
+        return 1
+    print("Stats summary is consistent")
+    return 0
+
+def _check_stats_triggers():
+    """Check the stats summary triggers with rolled-back sample writes, return 1 if they drift"""
+    consistent, stored, actual = check_stats_triggers()
+    print(f"Stats summary change after sample writes (total, scams, rating sum, ratings): "
+          f"stored {stored}, recomputed {actual}")
+    if not consistent:
+        print("Stats summary triggers do not match the airdrops table")
+        return 1
+    print("Stats summary triggers are consistent")
+    return 0
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="AirdropAgent database checks")
+    parser.add_argument('command', nargs='?', default='check',
+                        choices=['check', 'plans', 'check-triggers', 'check-stats', 'rebuild-stats',
+                                 'rebuild-search', 'rebuild-rollups'],
+                        help="check (default) runs plans and check-triggers; check-stats compares "
+                             "the stored summary of an existing database with its table")
+    args = parser.parse_args()
+    
+    status = 0
+    if args.command in ('check', 'plans'):
+        status |= _print_query_plans()
+    if args.command in ('check', 'check-triggers'):
+        status |= _check_stats_triggers()
+    if args.command in ('check-stats', 'rebuild-stats'):
+        status |= _check_stats(rebuild=args.command == 'rebuild-stats')
+    if args.command == 'rebuild-search':
+        rebuild_search_index()
+        print("Search index rebuilt")
+    if args.command == 'rebuild-rollups':
+        rebuild_rollups()
+        print("Rollups rebuilt")
+    raise SystemExit(status)
@@ -1,11 +1,9 @@
 """
 Main script for AirdropAgent
-This script runs both the Twitter monitor and web server
+This script supervises the web server, Twitter ingestion and analysis worker processes
 """
-import os
 import sys
-import time
-import threading
+import argparse
 import asyncio
 import logging
 from datetime import datetime
@@ -22,80 +20,68 @@
 
 logger = logging.getLogger("AirdropAgent")
 
-# Import Twitter client
-from app.scraper.twitter_client import start_twitter_monitoring
-# Import web app
-from web.app import app
-from config import SERVER_HOST, SERVER_PORT
+# Import Twitter ingestion and analysis entry points
+from app.scraper.twitter_client import start_ingestion, start_analysis_worker
+# Import web serving modes
+from web.server import run_server, SERVER_MODES
+from app.supervisor import Supervisor
+from config import (SERVER_HOST, SERVER_PORT, SERVER_MODE, SERVER_THREADS, SERVER_WORKERS, INGEST_WORKERS,
+                    ANALYSIS_WORKERS)
 
-def start_web_server():
+def start_web_server(mode=SERVER_MODE, threads=SERVER_THREADS, workers=SERVER_WORKERS):
     """Start the web server"""
-    logger.info("Starting web server on %s:%s", SERVER_HOST, SERVER_PORT)
-    app.run(host=SERVER_HOST, port=SERVER_PORT, debug=False)
+    logger.info("Starting web server on %s:%s (%s mode)", SERVER_HOST, SERVER_PORT, mode)
+    run_server(mode=mode, threads=threads, workers=workers)
 
-async def run_twitter_monitor():
-    """Run the Twitter monitor in async mode"""
-    logger.info("Starting Twitter monitor")
-    try:
-        await start_twitter_monitoring()
-    except Exception as e:
-        logger.error("Twitter monitor error: %s", str(e))
+def run_ingestion():
+    """Run Twitter ingestion in this process"""
+    logger.info("Starting Twitter ingestion")
+    asyncio.run(start_ingestion())
 
-def twitter_monitor_thread():
-    """Run Twitter monitor in a separate thread using asyncio"""
-    asyncio.run(run_twitter_monitor())
+def run_analysis_worker(name):
+    """Run an analysis worker in this process"""
+    logger.info("Starting analysis worker %s", name)
+    asyncio.run(start_analysis_worker(name))
 
-def start_watchdog(threads):
-    """
-    Watchdog to ensure all threads are running
-    If a thread dies, it will be restarted
-    """
-    logger.info("Starting watchdog")
-    
-    while True:
-        for thread_info in threads:
-            name, thread_obj, thread_func = thread_info
-            
-            if not thread_obj.is_alive():
-                logger.warning("Thread %s died, restarting", name)
-                new_thread = threading.Thread(target=thread_func, name=name)
-                new_thread.daemon = True
-                new_thread.start()
-                
-                # Update thread object in the list
-                thread_info[1] = new_thread
-        
-        # Check every 60 seconds
-        time.sleep(60)
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AirdropAgent - Twitter airdrop monitor and dashboard")
+    parser.add_argument('--serve', choices=SERVER_MODES, default=SERVER_MODE,
+                        help="web serving mode: dev (Flask development server), threaded (waitress) "
+                             "or prefork (gunicorn worker processes)")
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS,
+                        help="request threads (per worker in prefork mode)")
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS,
+                        help="worker processes in prefork mode")
+    parser.add_argument('--ingest-workers', type=int, default=INGEST_WORKERS,
+                        help="Twitter ingestion processes (0 to run without ingestion)")
+    parser.add_argument('--analysis-workers', type=int, default=ANALYSIS_WORKERS,
+                        help="analysis worker processes (0 to run without analysis)")
+    parser.add_argument('--no-web', action='store_true',
+                        help="run without the web server (e.g. extra analysis workers on another machine)")
+    return parser.parse_args()
 
 def main():
     """Main function to start all components"""
+    args = parse_args()
     logger.info("AirdropAgent starting at %s", datetime.now())
     
-    # Create threads
-    web_thread = threading.Thread(target=start_web_server, name="WebServer")
-    twitter_thread = threading.Thread(target=twitter_monitor_thread, name="TwitterMonitor")
-    
-    # Set as daemon threads so they exit when main thread exits
-    web_thread.daemon = True
-    twitter_thread.daemon = True
+    # Every role runs in its own processes, so a crash or a busy GIL in one never stalls the others
+    supervisor = Supervisor(log=logger.info)
+    if not args.no_web:
+        supervisor.add("web", start_web_server, args=(args.serve, args.threads, args.workers))
+    supervisor.add("ingestion", run_ingestion, count=args.ingest_workers)
+    supervisor.add("analysis", run_analysis_worker, count=args.analysis_workers, pass_name=True)
     
-    # Start threads
-    web_thread.start()
-    twitter_thread.start()
-    
-    # Create list of threads for watchdog
-    threads = [
-        ["WebServer", web_thread, start_web_server],
-        ["TwitterMonitor", twitter_thread, twitter_monitor_thread]
-    ]
+    if not supervisor.workers:
+        logger.error("Nothing to run - enable the web server or at least one worker")
+        sys.exit(1)
     
     try:
-        # Start watchdog in main thread
-        start_watchdog(threads)
+        supervisor.run()
     except KeyboardInterrupt:
         logger.info("AirdropAgent stopped by user")
         sys.exit(0)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -3,15 +3,24 @@
 """
 import sys
 import os
+import json
+import base64
+import sqlite3
+import hashlib
 import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+import functools
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, stream_with_context
+from markupsafe import escape
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 
 # Add root directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import database
-from config import SERVER_HOST, SERVER_PORT, ADMIN_USERNAME, ADMIN_PASSWORD
+from app.cache import LRUCache
+from web.stream import broadcaster, StreamFull, RETRY_MS
+from config import (SERVER_HOST, SERVER_PORT, ADMIN_USERNAME, ADMIN_PASSWORD, API_MAX_PAGE_SIZE, RESPONSE_CACHE_ENTRIES,
+                    ANALYTICS_DEFAULT_BUCKETS, ANALYTICS_MAX_BUCKETS)
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  # Secret key for sessions
@@ -38,6 +47,45 @@ def load_user(user_id):
         return admin_user
     return None
 
+# Rendered pages and API payloads by path and query string
+response_cache = LRUCache(RESPONSE_CACHE_ENTRIES)
+
+def cached_response(view=None, key=None):
+    """
+    Serve a view from memory until the data changes
+    
+    Entries are tagged with the database's data version, which triggers bump on every
+    airdrop or website data write, so a cached page is reused only while nothing was stored.
+    
+    Args:
+        view (callable): View function (when used as a bare decorator)
+        key (callable, optional): Returns extra cache key parts for views whose output also
+            depends on something other than the request and the data, e.g. the current time
+    """
+    if view is None:
+        return functools.partial(cached_response, key=key)
+    
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        generation = database.get_data_version()
+        cache_key = (request.path, request.query_string) + ((key(),) if key else ())
+        
+        entry = response_cache.get(cache_key)
+        if entry is not None and entry['generation'] == generation:
+            return app.response_class(entry['body'], status=entry['status'], headers=entry['headers'])
+        
+        response = app.make_response(view(*args, **kwargs))
+        # Redirects and errors (e.g. a missing airdrop with its flash message) are not reused
+        if response.status_code == 200 and not response.direct_passthrough:
+            response_cache.put(cache_key, {
+                'generation': generation,
+                'body': response.get_data(),
+                'status': response.status_code,
+                'headers': [(name, value) for name, value in response.headers if name != 'Content-Length']
+            })
+        return response
+    return wrapper
+
 @app.route('/')
 def index():
     """Root route - redirect to login or dashboard"""
@@ -73,6 +121,7 @@ def logout():
 
 @app.route('/dashboard')
 @login_required
+@cached_response
 def dashboard():
     """Main dashboard page"""
     # Get recent airdrops
@@ -81,6 +130,7 @@ def dashboard():
     # Get stats
     stats = database.get_stats()
     
+    # Cache hit/miss stats change without a data write, so the page loads them from /api/cache/stats
     return render_template('dashboard.html', 
                           airdrops=airdrops, 
                           stats=stats,
@@ -88,6 +138,7 @@ def dashboard():
 
 @app.route('/airdrop/<int:airdrop_id>')
 @login_required
+@cached_response
 def view_airdrop(airdrop_id):
     """View details for a specific airdrop"""
     airdrop = database.get_airdrop_by_id(airdrop_id)
@@ -100,21 +151,218 @@ def view_airdrop(airdrop_id):
                           airdrop=airdrop,
                           title=f"Airdrop Details: {airdrop['project_name']}")
 
+def encode_cursor(before):
+    """Encode a (timestamp, id) page position as an opaque cursor string"""
+    return base64.urlsafe_b64encode(json.dumps(before).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a cursor string, returns None if it is malformed"""
+    try:
+        timestamp, airdrop_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(airdrop_id, int):
+        return None
+    return timestamp, airdrop_id
+
 @app.route('/api/airdrops/recent')
 @login_required
 def api_recent_airdrops():
-    """API endpoint for recent airdrops"""
-    limit = request.args.get('limit', default=50, type=int)
-    airdrops = database.get_recent_airdrops(limit=limit)
-    return jsonify(airdrops)
+    """
+    API endpoint for recent airdrops, newest first
+    
+    Query parameters:
+        limit: Page size (at most API_MAX_PAGE_SIZE)
+        cursor: Value of the previous page's X-Next-Cursor header
+        fields: Comma-separated columns to return, e.g. "id,project_name,rating"
+    
+    The next page's cursor is returned in the X-Next-Cursor and Link headers.
+    """
+    limit = max(1, min(request.args.get('limit', default=50, type=int), API_MAX_PAGE_SIZE))
+    
+    before = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        before = decode_cursor(cursor)
+        if before is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    fields = None
+    if request.args.get('fields'):
+        fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in database.AIRDROP_FIELDS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    
+    # The data version changes with every write, so polling clients get a 304 without a table read
+    etag = hashlib.sha1(f"{database.get_data_version()}:{request.query_string.decode()}".encode('utf-8')).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    airdrops, next_before = database.get_airdrops_page(limit=limit, before=before, fields=fields)
+    
+    response = jsonify(airdrops)
+    response.set_etag(etag)
+    if next_before is not None:
+        next_cursor = encode_cursor(next_before)
+        next_args = dict(request.args, cursor=next_cursor)
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("api_recent_airdrops", **next_args)}>; rel="next"'
+    return response
+
+@app.route('/api/stream')
+@login_required
+def api_stream():
+    """
+    Server-Sent Events feed of newly stored airdrops and stats
+    
+    Resumes after the Last-Event-ID header sent by reconnecting browsers, or after
+    the last_id query parameter on the first connection.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    # Every open stream holds a request thread - turn clients away before they use them all up
+    try:
+        client = broadcaster.subscribe()
+    except StreamFull:
+        response = jsonify({'error': 'Too many live-feed connections, try again later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(RETRY_MS // 1000)
+        return response
+    
+    response = app.response_class(stream_with_context(broadcaster.stream(client, last_event_id)),
+                                  mimetype='text/event-stream')
+    # Also covers a response closed before the stream started
+    response.call_on_close(lambda: broadcaster.unsubscribe(client))
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def render_snippet(snippet):
+    """HTML-escape a search snippet and highlight the matched words"""
+    return str(escape(snippet or '')).replace(database.SNIPPET_START, '<mark>').replace(database.SNIPPET_END, '</mark>')
+
+@app.route('/api/search')
+@login_required
+def api_search():
+    """
+    API endpoint for full-text search over tweets, analyses and website text
+    
+    Query parameters:
+        q: Words to search for (the last one also matches as a prefix)
+        limit: Number of results (at most API_MAX_PAGE_SIZE)
+        offset: Number of results to skip
+    """
+    text = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', default=20, type=int), API_MAX_PAGE_SIZE))
+    offset = max(0, request.args.get('offset', default=0, type=int))
+    
+    try:
+        results = database.search_airdrops(text, limit=limit, offset=offset)
+    except sqlite3.OperationalError as e:
+        print(f"Search error: {e}")
+        return jsonify({'error': 'Search is not available'}), 503
+    
+    for result in results:
+        result['snippet'] = render_snippet(result['snippet'])
+    return jsonify({'query': text, 'results': results})
+
+def rollup_range():
+    """
+    Read the period and range of an analytics request
+    
+    Query parameters:
+        period: 'hour' or 'day' (default 'day')
+        buckets: Number of periods back from now (default from ANALYTICS_DEFAULT_BUCKETS)
+    
+    Returns:
+        tuple: (period, first bucket key, last bucket key), or None for an invalid request
+    """
+    period = request.args.get('period', 'day')
+    if period not in database.ROLLUP_PERIODS:
+        return None
+    buckets = request.args.get('buckets', default=ANALYTICS_DEFAULT_BUCKETS[period], type=int)
+    buckets = max(1, min(buckets, ANALYTICS_MAX_BUCKETS))
+    
+    # Bucket keys use the same format SQLite's strftime gives the stored timestamps
+    bucket_format = database.ROLLUP_PERIODS[period]
+    step = datetime.timedelta(hours=1) if period == 'hour' else datetime.timedelta(days=1)
+    now = datetime.datetime.now()
+    return period, (now - step * (buckets - 1)).strftime(bucket_format), now.strftime(bucket_format)
+
+@app.route('/api/analytics/series')
+@login_required
+@cached_response(key=rollup_range)
+def api_analytics_series():
+    """API endpoint for per-hour or per-day counts, average rating and rating histogram"""
+    window = rollup_range()
+    if window is None:
+        return jsonify({'error': 'period must be hour or day'}), 400
+    period, start, end = window
+    return jsonify({'period': period, 'start': start, 'end': end,
+                    'series': database.get_rollup_series(period, start, end)})
+
+@app.route('/api/analytics/ratings')
+@login_required
+@cached_response(key=rollup_range)
+def api_analytics_ratings():
+    """API endpoint for the rating histogram over a range"""
+    window = rollup_range()
+    if window is None:
+        return jsonify({'error': 'period must be hour or day'}), 400
+    period, start, end = window
+    return jsonify({'period': period, 'start': start, 'end': end,
+                    'bins': [f"{number}-{number + 1}" for number in range(database.RATING_BINS)],
+                    'histogram': database.get_rating_histogram(period, start, end)})
+
+@app.route('/api/analytics/top')
+@login_required
+@cached_response(key=rollup_range)
+def api_analytics_top():
+    """
+    API endpoint for the most active usernames or website domains over a range
+    
+    Query parameters:
+        kind: 'username' (default) or 'domain'
+        limit: Number of names (at most 100)
+    """
+    window = rollup_range()
+    kind = request.args.get('kind', 'username')
+    if window is None or kind not in database.ROLLUP_NAME_KINDS:
+        return jsonify({'error': 'period must be hour or day and kind username or domain'}), 400
+    period, start, end = window
+    limit = max(1, min(request.args.get('limit', default=10, type=int), 100))
+    return jsonify({'period': period, 'start': start, 'end': end, 'kind': kind,
+                    'top': database.get_top_names(kind, period, start, end, limit=limit)})
 
 @app.route('/api/stats')
 @login_required
+@cached_response
 def api_stats():
     """API endpoint for stats"""
     stats = database.get_stats()
     return jsonify(stats)
 
+@app.route('/api/cache/stats')
+@login_required
+def api_cache_stats():
+    """API endpoint for the hit/miss counts of each cache"""
+    return jsonify(database.get_cache_stats())
+
+@app.route('/api/ingestion/schedule')
+@login_required
+def api_ingestion_schedule():
+    """API endpoint for the cadence and new-tweet yield of each Twitter search query"""
+    schedule = database.get_search_schedule()
+    return jsonify({'queries': [dict(entry, query=query) for query, entry in schedule.items()]})
+
 # Error handlers
 @app.errorhandler(404)
 def page_not_found(e):
@@ -133,6 +381,7 @@ def server_error(e):
 # New routes for sidebar pages
 @app.route('/analytics')
 @login_required
+@cached_response
 def analytics():
     """Analytics page"""
     stats = database.get_stats()
@@ -142,6 +391,7 @@ def analytics():
 
 @app.route('/verified')
 @login_required
+@cached_response
 def verified_projects():
     """Verified projects page"""
     # Get projects with rating > 7.5
@@ -152,6 +402,7 @@ def verified_projects():
 
 @app.route('/scam-alerts')
 @login_required
+@cached_response
 def scam_alerts():
     """Scam alerts page"""
     # Get projects with rating < 4.0
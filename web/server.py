@@ -0,0 +1,112 @@
+"""
+Serving modes for the AirdropAgent web app
+dev: Flask's development server
+threaded: waitress with a fixed pool of request threads
+prefork: gunicorn with several worker processes sharing the SQLite database
+"""
+import sys
+import os
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SERVER_HOST, SERVER_PORT, SERVER_MODE, SERVER_THREADS, SERVER_WORKERS
+
+# Optional servers - the matching modes fall back when they are missing
+try:
+    import waitress
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    waitress = None
+    WAITRESS_AVAILABLE = False
+
+try:
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    BaseApplication = object
+    GUNICORN_AVAILABLE = False
+
+SERVER_MODES = ('dev', 'threaded', 'prefork')
+
+class GunicornApplication(BaseApplication):
+    def __init__(self, app, options):
+        """
+        Run a WSGI app under gunicorn without a config file
+
+        Args:
+            app: WSGI application
+            options (dict): gunicorn settings (bind, workers, threads, ...)
+        """
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+def serve_dev(app, host, port):
+    """Serve with Flask's development server"""
+    app.run(host=host, port=port, debug=False, threaded=True)
+
+def serve_threaded(app, host, port, threads=SERVER_THREADS):
+    """Serve with waitress and a fixed number of request threads"""
+    if not WAITRESS_AVAILABLE:
+        print("waitress is not installed - using Werkzeug's threaded server")
+        from werkzeug.serving import make_server
+        make_server(host, port, app, threaded=True).serve_forever()
+        return
+
+    print(f"Serving with waitress on {host}:{port} ({threads} threads)")
+    waitress.serve(app, host=host, port=port, threads=threads)
+
+def serve_prefork(app, host, port, workers=SERVER_WORKERS, threads=SERVER_THREADS):
+    """Serve with gunicorn worker processes, each with its own request threads"""
+    if not GUNICORN_AVAILABLE or os.name == 'nt':
+        print("gunicorn is not available - using the threaded server")
+        serve_threaded(app, host, port, threads)
+        return
+
+    print(f"Serving with gunicorn on {host}:{port} ({workers} workers x {threads} threads)")
+    GunicornApplication(app, {
+        'bind': f"{host}:{port}",
+        'workers': workers,
+        # Threaded workers so open live-feed streams don't each hold a whole process
+        'worker_class': 'gthread',
+        'threads': threads,
+        # Load the app before forking so every worker shares the session secret key
+        'preload_app': True
+    }).run()
+
+def run_server(mode=SERVER_MODE, host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS, workers=SERVER_WORKERS):
+    """
+    Serve the web app in the given mode
+
+    Args:
+        mode (str): 'dev', 'threaded' or 'prefork'
+        host (str): Interface to bind
+        port (int): Port to bind
+        threads (int): Request threads (per worker in prefork mode)
+        workers (int): Worker processes in prefork mode
+    """
+    from web.app import app
+    from web.stream import broadcaster
+
+    # Each live-feed stream holds a request thread - leave at least half of them for other requests
+    if mode != 'dev' and broadcaster.max_clients > threads // 2:
+        broadcaster.max_clients = max(1, threads // 2)
+        print(f"Live feed limited to {broadcaster.max_clients} connections per process ({threads} threads)")
+
+    if mode == 'prefork':
+        serve_prefork(app, host, port, workers, threads)
+    elif mode == 'threaded':
+        serve_threaded(app, host, port, threads)
+    else:
+        serve_dev(app, host, port)
+
+if __name__ == '__main__':
+    run_server()
@@ -0,0 +1,215 @@
+"""
+Live feed of new analyses for the AirdropAgent dashboard
+One broadcaster thread polls the database's data version and fans new airdrops and
+stats out to every connected Server-Sent Events client
+"""
+import sys
+import os
+import json
+import time
+import queue
+import threading
+from collections import deque
+
+# Add root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (STREAM_POLL_SECONDS, STREAM_HEARTBEAT_SECONDS, STREAM_REPLAY_EVENTS, STREAM_CLIENT_QUEUE_SIZE,
+                    STREAM_MAX_CLIENTS)
+import database
+
+# Columns pushed for each new airdrop - enough for a dashboard table row
+STREAM_FIELDS = ['id', 'project_name', 'username', 'website_url', 'rating', 'is_scam', 'timestamp']
+
+# Rows fetched per poll
+FETCH_BATCH = 100
+
+# Browser reconnect delay after a dropped connection, in milliseconds
+RETRY_MS = 3000
+
+class StreamFull(Exception):
+    """Raised when a client subscribes while max_clients streams are open"""
+
+def format_event(event, data, event_id=None):
+    """Format one Server-Sent Event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+def airdrop_event(airdrop):
+    """Format a new airdrop as an event whose ID is the airdrop ID"""
+    return airdrop['id'], format_event('airdrop', airdrop, airdrop['id'])
+
+class StreamBroadcaster:
+    def __init__(self, poll_seconds=STREAM_POLL_SECONDS, replay_events=STREAM_REPLAY_EVENTS,
+                 client_queue_size=STREAM_CLIENT_QUEUE_SIZE, max_clients=STREAM_MAX_CLIENTS):
+        """
+        Create the broadcaster
+
+        Args:
+            poll_seconds (float): How often the database is checked for changes
+            replay_events (int): Recent airdrop events kept for resuming clients
+            client_queue_size (int): Events buffered per client before it is dropped
+            max_clients (int): Open streams allowed at once - each holds a server request thread
+        """
+        self.poll_seconds = poll_seconds
+        self.client_queue_size = client_queue_size
+        self.max_clients = max_clients
+        self._replay = deque(maxlen=replay_events)  # (airdrop ID, formatted event)
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_id = None
+        self._data_version = None
+        self._stats = None
+
+    def _ensure_thread(self):
+        """Start the polling thread on first subscription"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='airdrop-stream', daemon=True)
+                self._thread.start()
+
+    def subscribe(self):
+        """
+        Register a client
+
+        Returns:
+            queue.Queue: Formatted events for this client; None is queued if it falls too far behind
+
+        Raises:
+            StreamFull: max_clients streams are already open
+        """
+        client = queue.Queue(self.client_queue_size)
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                raise StreamFull(f"{len(self._clients)} live-feed clients connected")
+            self._clients.add(client)
+        self._ensure_thread()
+        return client
+
+    def unsubscribe(self, client):
+        """Remove a client"""
+        with self._lock:
+            self._clients.discard(client)
+
+    def missed_events(self, last_event_id):
+        """
+        Get the airdrop events a resuming client has not seen
+
+        Args:
+            last_event_id (int): ID of the last airdrop the client received
+
+        Returns:
+            list: (airdrop ID, formatted event) tuples in ID order
+        """
+        with self._lock:
+            replay = list(self._replay)
+        if replay and replay[0][0] <= last_event_id + 1:
+            return [(event_id, event) for event_id, event in replay if event_id > last_event_id]
+
+        # Older than the replay buffer - read the gap from the database
+        airdrops = database.get_airdrops_after(last_event_id, limit=STREAM_REPLAY_EVENTS, fields=STREAM_FIELDS)
+        return [airdrop_event(airdrop) for airdrop in airdrops]
+
+    def _publish(self, event):
+        """Queue an event for every client, dropping clients that stopped reading"""
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(event)
+            except queue.Full:
+                self.unsubscribe(client)
+                # Make room for the end-of-stream marker
+                try:
+                    client.get_nowait()
+                except queue.Empty:
+                    pass
+                client.put_nowait(None)
+
+    def _poll(self):
+        """Publish airdrops and stats stored since the last poll"""
+        data_version = database.get_data_version()
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+
+        if self._last_id is None:
+            # Clients get the current page on load - only newer rows are pushed
+            self._last_id = database.get_latest_airdrop_id()
+
+        while True:
+            airdrops = database.get_airdrops_after(self._last_id, limit=FETCH_BATCH, fields=STREAM_FIELDS)
+            for airdrop in airdrops:
+                event = airdrop_event(airdrop)
+                with self._lock:
+                    self._replay.append(event)
+                self._publish(event)
+                self._last_id = airdrop['id']
+            if len(airdrops) < FETCH_BATCH:
+                break
+
+        stats = database.get_stats()
+        if stats != self._stats:
+            previous = self._stats or stats
+            delta = {key: stats[key] - previous[key] for key in ('total_airdrops', 'scam_count', 'legitimate_count')}
+            self._publish((None, format_event('stats', dict(stats, delta=delta))))
+            self._stats = stats
+
+    def _run(self):
+        """Poll while clients are connected"""
+        while True:
+            with self._lock:
+                has_clients = bool(self._clients)
+            if has_clients:
+                try:
+                    self._poll()
+                except Exception as e:
+                    print(f"Stream poll error: {e}")
+            time.sleep(self.poll_seconds)
+
+    def stream(self, client, last_event_id=None):
+        """
+        Generate the Server-Sent Events for one client
+
+        Args:
+            client (queue.Queue): Queue returned by subscribe(), unsubscribed when the stream ends
+            last_event_id (int, optional): Last airdrop ID the client saw, from the Last-Event-ID header
+
+        Yields:
+            str: Formatted events and keep-alive comments
+        """
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+
+            # Events are published after the client subscribed, so nothing falls between replay and live
+            last_sent = last_event_id
+            if last_event_id is not None:
+                for event_id, event in self.missed_events(last_event_id):
+                    yield event
+                    last_sent = event_id
+
+            while True:
+                try:
+                    item = client.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+
+                event_id, event = item
+                # Skip airdrops already sent from the replay
+                if event_id is not None and last_sent is not None and event_id <= last_sent:
+                    continue
+                yield event
+                if event_id is not None:
+                    last_sent = event_id
+        finally:
+            self.unsubscribe(client)
+
+# Shared broadcaster for all dashboard connections
+broadcaster = StreamBroadcaster()